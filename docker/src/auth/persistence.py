@@ -1,15 +1,26 @@
 from abc import ABC, abstractmethod
-from typing import Optional, Type, TypeVar, Generic, Dict, Tuple
-from pydantic import BaseModel
+from typing import TYPE_CHECKING, Optional, Type, TypeVar, Generic, Dict, Tuple, Iterable, Sequence
+from pydantic import BaseModel, TypeAdapter
+import msgpack
+import logging
 import time
 import asyncio
+import itertools
 from src.logging_util import get_logger
 from src.config import Settings
-from collections import deque
-import math
+import threading
 from dataclasses import dataclass
-from src.sdk.catalyst_client import CatalystCache
-from src.sdk.redis_client import RedisClientSingleton
+from functools import lru_cache, partial
+from cachetools import TTLCache
+from contextvars import ContextVar
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# redis and the Catalyst client are imported by the providers that use them, so
+# in-memory deployments do not pay for (or need) either import.
+if TYPE_CHECKING:
+    import redis.asyncio as aioredis
+    from redis.asyncio.client import Pipeline
+    from src.sdk.catalyst_client import AsyncCatalystCache
 
 
 logger = get_logger(__name__)
@@ -17,77 +28,366 @@ logger = get_logger(__name__)
 T = TypeVar("T", bound=BaseModel)
 
 class PersistenceProvider(ABC, Generic[T]):
+    # ABC and Generic both declare empty __slots__, so providers carry no __dict__
+    __slots__ = ("model_class", "_adapter")
+
     def __init__(self, model_class: Type[T]):
         self.model_class = model_class
+        # Built once per store so the validator schema is not walked on every read
+        self._adapter = TypeAdapter(model_class)
+
+    def _serialize(self, value: T) -> bytes:
+        return self._adapter.dump_json(value)
+
+    def _deserialize(self, raw: str | bytes) -> T:
+        return self._adapter.validate_json(raw)
 
     @abstractmethod
-    def set(self, key: str, value: T, ttl_in_sec: Optional[int] = None) -> None:
+    async def set(self, key: str, value: T, ttl_in_sec: Optional[int] = None) -> None:
         """Store the model instance with an optional TTL."""
         pass
 
     @abstractmethod
-    def get(self, key: str) -> Optional[T]:
+    async def get(self, key: str) -> Optional[T]:
         """Retrieve and validate the model instance."""
         pass
 
     @abstractmethod
-    def delete(self, key: str) -> None:
+    async def delete(self, key: str) -> None:
         """Remove the key from storage."""
         pass
 
+    async def pop(self, key: str) -> Optional[T]:
+        """
+        Retrieve the model instance and remove the key. Backends that can do
+        both in one step override this so two callers never get the same value.
+        """
+        value = await self.get(key)
+        if value is not None:
+            await self.delete(key)
+        return value
+
+    async def get_many(self, keys: Sequence[str]) -> list[Optional[T]]:
+        """Retrieve several model instances, in the order of ``keys``."""
+        return [await self.get(key) for key in keys]
+
+    async def set_many(self, pairs: Iterable[Tuple[str, T]], ttl_in_sec: Optional[int] = None) -> None:
+        """Store several model instances sharing the same optional TTL."""
+        for key, value in pairs:
+            await self.set(key, value, ttl_in_sec)
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        """Remove several keys from storage."""
+        for key in keys:
+            await self.delete(key)
+
 
 class InMemoryProvider(PersistenceProvider[T]):
-    def __init__(self, model_class: Type[T]):
+    __slots__ = ("_data", "_expiry", "_evictions", "_lock", "max_size")
+
+    def __init__(self, model_class: Type[T], max_size: Optional[int] = None):
         super().__init__(model_class)
-        self._data: dict[str, str] = {}
-        self._expiry_queue = deque()  # (expiry_time, key)
+        # Upper bound on stored keys; the oldest writes are dropped beyond it
+        self.max_size = max_size
+        # key -> msgpack-encoded value
+        self._data: dict[str, bytes] = {}
+        # key -> time.monotonic() expiry, for keys stored with a TTL
+        self._expiry: dict[str, float] = {}
+        # key -> event loop timer that evicts it once its TTL elapses
+        self._evictions: dict[str, asyncio.TimerHandle] = {}
+        self._lock = threading.Lock()
+
+    # Values never leave the process, so they are kept as compact msgpack bytes
+    # rather than the JSON text shared with Redis and Catalyst.
+    def _serialize(self, value: T) -> bytes:
+        return msgpack.packb(value.model_dump(mode="json"), use_bin_type=True)
+
+    def _deserialize(self, raw: bytes) -> T:
+        return self._adapter.validate_python(msgpack.unpackb(raw, raw=False))
+
+    def _evict(self, key: str) -> None:
+        with self._lock:
+            self._evictions.pop(key, None)
+            self._expiry.pop(key, None)
+            self._data.pop(key, None)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Evicted expired key: %s", key)
+
+    def _cancel_eviction(self, key: str) -> None:
+        handle = self._evictions.pop(key, None)
+        if handle is not None:
+            handle.cancel()
+
+    async def set(self, key: str, value: T, ttl_in_sec: Optional[int] = None) -> None:
+        payload = self._serialize(value)
+        with self._lock:
+            # Popped first so an overwrite moves the key to the end of the insertion order
+            self._data.pop(key, None)
+            self._data[key] = payload
+            self._cancel_eviction(key)
+            if ttl_in_sec:
+                self._expiry[key] = time.monotonic() + ttl_in_sec
+                # The loop's timer heap orders evictions; cancelled timers are purged by asyncio
+                self._evictions[key] = asyncio.get_running_loop().call_later(ttl_in_sec, self._evict, key)
+            else:
+                self._expiry.pop(key, None)
+            if self.max_size is not None and len(self._data) > self.max_size:
+                self._drop_oldest(len(self._data) - self.max_size)
+
+    def _drop_oldest(self, count: int) -> None:
+        # Dicts keep insertion order, so the first keys are the least recently
+        # written ones (set() re-inserts the key it overwrites)
+        for key in list(itertools.islice(self._data, count)):
+            del self._data[key]
+            self._expiry.pop(key, None)
+            self._cancel_eviction(key)
+
+    async def get(self, key: str) -> Optional[T]:
+        if (raw := self._data.get(key)) is None:
+            return None
+        # The timer can run slightly late, so the deadline is still checked here
+        if (expiry_time := self._expiry.get(key)) is not None and expiry_time <= time.monotonic():
+            return None
+        return self._deserialize(raw)
+
+    async def pop(self, key: str) -> Optional[T]:
+        with self._lock:
+            raw = self._data.pop(key, None)
+            expiry_time = self._expiry.pop(key, None)
+            self._cancel_eviction(key)
+        if raw is None or (expiry_time is not None and expiry_time <= time.monotonic()):
+            return None
+        return self._deserialize(raw)
 
-    def set(self, key: str, value: T, ttl_in_sec: Optional[int] = None) -> None:
-        self._data[key] = value.model_dump_json()
-        if ttl_in_sec:
-            expiry_time = time.time() + ttl_in_sec
-            self._expiry_queue.append((expiry_time, key))
+    async def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+            self._expiry.pop(key, None)
+            self._cancel_eviction(key)
 
-    def get(self, key: str) -> Optional[T]:
-        raw = self._data.get(key)
-        return self.model_class.model_validate_json(raw) if raw else None
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+                self._expiry.pop(key, None)
+                self._cancel_eviction(key)
 
-    def delete(self, key: str) -> None:
-        self._data.pop(key, None)
 
-    def cleanup_expired(self) -> int:
-        """Removes expired items and returns the count of deleted items."""
-        now = time.time()
-        count = 0
-        while self._expiry_queue and self._expiry_queue[0][0] <= now:
-            _, key = self._expiry_queue.popleft()
-            if key in self._data:
-                logger.debug(f"Cleaning up expired key: {key}")
-                del self._data[key]
-                count += 1
-        return count
+# Connection pools shared by every RedisProvider, keyed by server, so stores reuse sockets
+_POOLS: dict[tuple[str, int, Optional[str]], "aioredis.ConnectionPool"] = {}
 
 
+def _new_redis_pool(host: str, port: int, password: str | None) -> "aioredis.ConnectionPool":
+    import redis.asyncio as aioredis
+    from src.sdk.redis_client import keepalive_options
+    # Blocking, like the rate limiter's pool: a burst waits up to REDIS_POOL_TIMEOUT
+    # for a free connection instead of failing once max_connections is reached
+    return aioredis.BlockingConnectionPool(
+        host=host,
+        port=port,
+        password=password,
+        # Values go straight to validate_json, which takes bytes, so
+        # replies are not decoded to str first
+        max_connections=Settings.REDIS_POOL_SIZE,
+        timeout=Settings.REDIS_POOL_TIMEOUT,
+        socket_keepalive=True,
+        socket_keepalive_options=keepalive_options(),
+    )
 
-class RedisProvider(PersistenceProvider[T]):
-    def __init__(self, model_class: Type[T], host: str, port: int, prefix: str, password: str | None = None):
-        super().__init__(model_class)
-        self.client = RedisClientSingleton.get_client()
-        self.prefix = prefix
 
-    def _get_key(self, key: str) -> str:
-        return f"{self.prefix}:{key}"
+def _get_redis_pool(host: str, port: int, password: str | None) -> "aioredis.ConnectionPool":
+    """Connection pool for the given Redis server, created on first use."""
+    key = (host, port, password)
+    # setdefault is atomic, so racing callers still end up sharing one pool; creating
+    # a pool opens no sockets, so a discarded duplicate costs nothing.
+    return _POOLS.get(key) or _POOLS.setdefault(key, _new_redis_pool(host, port, password))
 
-    def set(self, key: str, value: T, ttl_in_sec: Optional[int] = None) -> None:
-        full_key = self._get_key(key)
-        self.client.set(full_key, value.model_dump_json(), ex=ttl_in_sec)
 
-    def get(self, key: str) -> Optional[T]:
-        raw = self.client.get(self._get_key(key))
-        return self.model_class.model_validate_json(raw) if raw else None
+# Pipeline collecting RedisProvider writes for the current request, installed by
+# RedisWriteBatchMiddleware. None outside a request, where writes run immediately.
+_redis_pipe_ctx: ContextVar[Optional["Pipeline"]] = ContextVar("_redis_pipe_ctx", default=None)
+
 
-    def delete(self, key: str) -> None:
-        self.client.delete(self._get_key(key))
+async def _flush_redis_writes() -> None:
+    pipe = _redis_pipe_ctx.get()
+    if pipe is not None and len(pipe):
+        await pipe.execute()
+
+
+class RedisWriteBatchMiddleware:
+    """
+    Sends all RedisProvider writes made while handling a request in one pipeline.
+
+    Queued writes are flushed before the response starts, so a client following
+    a redirect always sees them, and before any RedisProvider read in the same
+    request, so reads observe earlier writes.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._client: Optional["aioredis.Redis"] = None
+
+    def _get_client(self) -> "aioredis.Redis":
+        if self._client is None:
+            import redis.asyncio as aioredis
+            self._client = aioredis.Redis(
+                connection_pool=_get_redis_pool(Settings.REDIS_HOST, Settings.REDIS_PORT, Settings.REDIS_PASSWORD)
+            )
+        return self._client
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def flushing_send(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                await _flush_redis_writes()
+            await send(message)
+
+        token = _redis_pipe_ctx.set(self._get_client().pipeline(transaction=False))
+        try:
+            await self.app(scope, receive, flushing_send)
+        finally:
+            try:
+                await _flush_redis_writes()
+            finally:
+                _redis_pipe_ctx.reset(token)
+
+
+class RedisProvider(PersistenceProvider[T]):
+    __slots__ = ("client", "prefix", "_prefix_bytes", "_local", "_redis_get", "_redis_set", "_dump", "_load")
+
+    def __init__(
+        self,
+        model_class: Type[T],
+        host: str,
+        port: int,
+        prefix: str,
+        password: str | None = None,
+        local_cache_ttl: int = 0,
+        local_cache_size: int = 8192,
+    ):
+        super().__init__(model_class)
+        import redis.asyncio as aioredis
+        self.client = aioredis.Redis(connection_pool=_get_redis_pool(host, port, password))
+        self.prefix = prefix
+        # Bound once here rather than looked up attribute by attribute on every get/set
+        self._redis_get = self.client.get
+        self._redis_set = self.client.set
+        self._dump = self._adapter.dump_json
+        self._load = self._adapter.validate_json
+        # Redis accepts bytes keys, so the "<prefix>:" part is encoded only once
+        self._prefix_bytes = f"{prefix}:".encode()
+        # Optional per-process cache of raw values. Writes and deletes made by other
+        # workers are only seen once an entry expires, so it is only enabled for
+        # stores that tolerate reads being up to local_cache_ttl seconds stale.
+        self._local: Optional[TTLCache] = (
+            TTLCache(maxsize=local_cache_size, ttl=local_cache_ttl) if local_cache_ttl > 0 else None
+        )
+
+    def _get_key(self, key: str) -> bytes:
+        return self._prefix_bytes + key.encode()
+
+    async def set(self, key: str, value: T, ttl_in_sec: Optional[int] = None) -> None:
+        full_key = self._prefix_bytes + key.encode()
+        payload = self._dump(value)
+        local = self._local
+        pipe = _redis_pipe_ctx.get()
+        if pipe is not None:
+            # Only queued until the pipeline flushes, so the next get() reads it back from Redis
+            pipe.set(full_key, payload, ex=ttl_in_sec)
+            if local is not None:
+                local.pop(key, None)
+        else:
+            await self._redis_set(full_key, payload, ex=ttl_in_sec)
+            if local is not None:
+                local[key] = payload
+
+    async def get(self, key: str) -> Optional[T]:
+        local = self._local
+        if local is not None and (raw := local.get(key)) is not None:
+            return self._load(raw)
+        await _flush_redis_writes()
+        if not (raw := await self._redis_get(self._prefix_bytes + key.encode())):
+            return None
+        if local is not None:
+            local[key] = raw
+        return self._load(raw)
+
+    async def pop(self, key: str) -> Optional[T]:
+        if self._local is not None:
+            self._local.pop(key, None)
+        await _flush_redis_writes()
+        # GETDEL (Redis >= 6.2) reads and removes in one command
+        if not (raw := await self.client.getdel(self._prefix_bytes + key.encode())):
+            return None
+        return self._load(raw)
+
+    async def delete(self, key: str) -> None:
+        if self._local is not None:
+            self._local.pop(key, None)
+        pipe = _redis_pipe_ctx.get()
+        if pipe is not None:
+            pipe.delete(self._get_key(key))
+        else:
+            await self.client.delete(self._get_key(key))
+
+    async def get_many(self, keys: Sequence[str]) -> list[Optional[T]]:
+        if not keys:
+            return []
+        local = self._local
+        prefix = self._prefix_bytes
+        if local is None:
+            await _flush_redis_writes()
+            raws = await self.client.mget([prefix + key.encode() for key in keys])
+        else:
+            raws = [local.get(key) for key in keys]
+            missing = [i for i, raw in enumerate(raws) if raw is None]
+            if missing:
+                await _flush_redis_writes()
+                fetched = await self.client.mget([prefix + keys[i].encode() for i in missing])
+                for i, raw in zip(missing, fetched):
+                    if raw:
+                        raws[i] = local[keys[i]] = raw
+        load = self._load
+        return [load(raw) if raw else None for raw in raws]
+
+    async def set_many(self, pairs: Iterable[Tuple[str, T]], ttl_in_sec: Optional[int] = None) -> None:
+        # One round-trip for the whole batch; no MULTI since the writes are independent.
+        # Inside a request the writes join the request's pipeline instead.
+        request_pipe = _redis_pipe_ctx.get()
+        pipe = request_pipe if request_pipe is not None else self.client.pipeline(transaction=False)
+        dump = self._dump
+        payloads = [(key, dump(value)) for key, value in pairs]
+        prefix, pipe_set = self._prefix_bytes, pipe.set
+        for key, payload in payloads:
+            pipe_set(prefix + key.encode(), payload, ex=ttl_in_sec)
+        if (local := self._local) is not None:
+            if request_pipe is None:
+                await pipe.execute()
+                local.update(payloads)
+            else:
+                for key, _ in payloads:
+                    local.pop(key, None)
+        elif request_pipe is None:
+            await pipe.execute()
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        if not keys:
+            return
+        if self._local is not None:
+            for key in keys:
+                self._local.pop(key, None)
+        # A single multi-key DEL; inside a request it joins the request's pipeline
+        prefix = self._prefix_bytes
+        full_keys = [prefix + key.encode() for key in keys]
+        pipe = _redis_pipe_ctx.get()
+        if pipe is not None:
+            pipe.delete(*full_keys)
+        else:
+            await self.client.delete(*full_keys)
 
 
 @dataclass(frozen=True)
@@ -102,6 +402,60 @@ class CatalystSDKConfig:
     app_name: str = "MyAppCatalystSDK"
 
 
+# Cache clients shared by every CatalystCacheProvider on the same segment, so all
+# stores reuse one access token and one pool of HTTP/2 connections
+@lru_cache(maxsize=None)
+def _get_catalyst_cache(cfg: CatalystSDKConfig, segment_id: str) -> "AsyncCatalystCache":
+    from src.sdk.catalyst_client import AsyncCatalystCache
+    return AsyncCatalystCache(
+        client_id=cfg.client_id,
+        client_secret=cfg.client_secret,
+        refresh_token=cfg.refresh_token,
+        project_id=str(cfg.project_id),
+        segment_id=segment_id,
+        api_domain=cfg.project_domain,
+        accounts_server_url=Settings._get_accounts_url(cfg.project_domain)
+    )
+
+
+class _CircuitBreaker:
+    """
+    Skips calls to a failing backend for a while.
+
+    After ``fail_max`` consecutive failures the breaker opens for ``reset_timeout``
+    seconds. The first call after that is let through as a probe while other
+    calls stay blocked; a failure re-opens it straight away, a success closes it.
+    A probe that reports neither is retried after another ``reset_timeout``.
+    """
+
+    __slots__ = ("name", "fail_max", "reset_timeout", "_failures", "_open_until")
+
+    def __init__(self, name: str, fail_max: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._open_until = 0.0
+
+    def allow(self) -> bool:
+        if self._failures < self.fail_max:
+            return True
+        now = time.monotonic()
+        if now < self._open_until:
+            return False
+        # Half-open: this caller is the probe; the rest wait for its outcome
+        self._open_until = now + self.reset_timeout
+        return True
+
+    def record_success(self) -> None:
+        self._failures = 0
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._failures >= self.fail_max:
+            self._open_until = time.monotonic() + self.reset_timeout
+            logger.warning("%s failing, skipping calls for %ss", self.name, self.reset_timeout)
+
 
 class CatalystCacheProvider(PersistenceProvider[T]):
     """
@@ -110,14 +464,27 @@ class CatalystCacheProvider(PersistenceProvider[T]):
     - Keys and values in Catalyst cache are strings.
     - TTL is specified in HOURS.
     - Uses direct REST API calls with async/await instead of the Catalyst SDK.
+    - Batched reads and writes go through AsyncCatalystCache.mget/mset.
+    - set() is write-behind: the insert runs in a background task. Reads and
+      deletes of the same key wait for it first, and CatalystWriteFlushMiddleware
+      waits for the request's own writes before its response is sent, failing
+      the request if one of them failed. The local cache is filled only once a
+      write has landed.
+    - Reads treat transport and parse errors as misses, behind a circuit breaker
+      so an unreachable cache is not called on every request. OAuth failures
+      and programming errors are raised.
     """
 
+    __slots__ = ("prefix", "_cache_client", "_pending", "_local", "_breaker", "_read_errors")
+
     def __init__(
         self,
         model_class: Type[T],
         cfg: CatalystSDKConfig,
         prefix: str,
         segment_id: Optional[str] = None,
+        local_cache_ttl: int = 0,
+        local_cache_size: int = 1024,
     ):
         super().__init__(model_class)
         self.prefix = prefix
@@ -125,34 +492,26 @@ class CatalystCacheProvider(PersistenceProvider[T]):
         if not segment_id:
             raise ValueError("segment_id is required for REST API implementation")
         
-        # Initialize the async REST API cache client
-        self._cache_client = CatalystCache(
-            client_id=cfg.client_id,
-            client_secret=cfg.client_secret,
-            refresh_token=cfg.refresh_token,
-            project_id=str(cfg.project_id),
-            segment_id=segment_id,
-            api_domain=cfg.project_domain,
-            accounts_server_url=self._get_accounts_url(cfg.project_domain)
+        from src.sdk.catalyst_client import ServerError
+        self._cache_client = _get_catalyst_cache(cfg, segment_id)
+        self._breaker = _CircuitBreaker(f"Catalyst cache ({prefix})")
+        # orjson parse errors are ValueErrors
+        self._read_errors = (ServerError, ValueError)
+        # key -> task of the most recent queued insert for it
+        self._pending: dict[str, asyncio.Task] = {}
+        _write_behind_providers.append(self)
+        # Optional per-process read-through cache of raw values, with the same
+        # staleness trade-off as RedisProvider's
+        self._local: Optional[TTLCache] = (
+            TTLCache(maxsize=local_cache_size, ttl=local_cache_ttl) if local_cache_ttl > 0 else None
         )
 
-
-
-    @staticmethod
-    def _get_accounts_url(project_domain: str) -> str:
-        region_map = {
-            ".zoho.in": "https://accounts.zoho.in",
-            ".zoho.eu": "https://accounts.zoho.eu",
-            ".zoho.com.au": "https://accounts.zoho.com.au",
-            ".zoho.jp": "https://accounts.zoho.jp",
-        }
-        for suffix, url in region_map.items():
-            if project_domain.endswith(suffix):
-                return url
-        return "https://accounts.zoho.com"
-
     def _get_key(self, key: str) -> str:
         return f"{self.prefix}:{key}"
+
+    def _serialize(self, value: T) -> str:
+        # Catalyst cache values are strings inside a JSON request body
+        return self._adapter.dump_json(value).decode()
     
     @staticmethod
     def _sec_to_expiry_hours(ttl_in_sec: Optional[int]) -> Optional[int]:
@@ -160,55 +519,232 @@ class CatalystCacheProvider(PersistenceProvider[T]):
             return None
         if ttl_in_sec <= 0:
             return None
-        return max(1, int(math.ceil(ttl_in_sec / 3600)))
-
-    def set(self, key: str, value: T, ttl_in_sec: Optional[int] = None) -> None:
-        """Store the model instance with an optional TTL."""
-        full_key = self._get_key(key)
-        payload = value.model_dump_json()
+        # Integer ceiling division; avoids float rounding at exact hour boundaries
+        return max(1, (ttl_in_sec + 3599) // 3600)
+
+    async def _write(
+        self, key: str, payload: str, expiry_hours: Optional[int], previous: Optional[asyncio.Task]
+    ) -> None:
+        if previous is not None:
+            # Keep writes to one key in order; the earlier task reports its own failure
+            await asyncio.wait([previous])
+        # mset goes through the client's batch queue, so writes from concurrent
+        # requests within the batch window are submitted together
+        await self._cache_client.mset([(self._get_key(key), payload)], expiry_in_hours=expiry_hours)
+        # Only a stored value may be served locally
+        if self._local is not None:
+            self._local[key] = payload
+
+    def _on_write_done(self, key: str, task: asyncio.Task) -> None:
+        if self._pending.get(key) is task:
+            del self._pending[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Catalyst cache write for %s failed: %s", key, task.exception())
+
+    async def _wait_pending(self, keys: Iterable[str]) -> None:
+        tasks = [task for task in map(self._pending.get, keys) if task is not None]
+        if tasks:
+            await asyncio.wait(tasks)
+
+    async def flush(self) -> None:
+        """Wait for every queued write to finish."""
+        if self._pending:
+            await asyncio.wait(list(self._pending.values()))
+
+    async def set(self, key: str, value: T, ttl_in_sec: Optional[int] = None) -> None:
+        """Queue the model instance for storage with an optional TTL."""
+        payload = self._serialize(value)
         expiry_hours = self._sec_to_expiry_hours(ttl_in_sec)
-        self._cache_client.insert(
-            cache_name=full_key,
-            cache_value=payload,
-            expiry_in_hours=expiry_hours
-        )
+        task = asyncio.create_task(self._write(key, payload, expiry_hours, self._pending.get(key)))
+        self._pending[key] = task
+        task.add_done_callback(partial(self._on_write_done, key))
+        if (request_writes := _catalyst_writes_ctx.get()) is not None:
+            request_writes.append(task)
 
-    def get(self, key: str) -> Optional[T]:
+    @staticmethod
+    def _raw_value(response: Optional[Dict]) -> Optional[str]:
+        # Response structure: {"status": "success", "data": {"cache_value": "...", ...}}
+        if not response or response.get("status") != "success":
+            return None
+        return response.get("data", {}).get("cache_value") or None
+
+    def _on_read_error(self, exc: Exception) -> None:
+        if getattr(exc, "is_oauth_error", False):
+            raise exc
+        # A 4xx is an answer from a healthy backend (e.g. an unknown key), not an outage
+        status_code = getattr(exc, "status_code", None)
+        if status_code is None or status_code >= 500:
+            self._breaker.record_failure()
+            return
+        self._breaker.record_success()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Catalyst cache read rejected: %s", exc)
+
+    async def get(self, key: str) -> Optional[T]:
         """Retrieve and validate the model instance."""
+        # A queued write replaces the local entry once it lands, so it goes first
+        await self._wait_pending((key,))
+        local = self._local
+        if local is not None and (raw_value := local.get(key)) is not None:
+            return self._deserialize(raw_value)
         full_key = self._get_key(key)
+        if not self._breaker.allow():
+            return None
         try:
-            response = self._cache_client.get(full_key)
-            # Response structure: {"status": "success", "data": {"cache_value": "...", ...}}
-            if response and response.get("status") == "success":
-                data = response.get("data", {})
-                raw_value = data.get("cache_value")
-                if raw_value:
-                    return self.model_class.model_validate_json(raw_value)
+            raw_value = self._raw_value(await self._cache_client.get(full_key))
+        except self._read_errors as exc:
+            self._on_read_error(exc)
             return None
-        except Exception:
+        self._breaker.record_success()
+        if raw_value is None:
             return None
+        if local is not None:
+            local[key] = raw_value
+        return self._deserialize(raw_value)
 
-    def delete(self, key: str) -> None:
+    async def delete(self, key: str) -> None:
         """Remove the key from storage."""
-        full_key = self._get_key(key)
-        self._cache_client.delete(full_key)
-
-    def close(self) -> None:
+        # After the queued write, which fills the local cache once it lands
+        await self._wait_pending((key,))
+        if self._local is not None:
+            self._local.pop(key, None)
+        await self._cache_client.delete(self._get_key(key))
+
+    async def get_many(self, keys: Sequence[str]) -> list[Optional[T]]:
+        """Retrieve several model instances with concurrent lookups."""
+        # As in get(), queued writes land before the local cache is consulted
+        await self._wait_pending(keys)
+        local = self._local
+        raws: list[Optional[str]] = [local.get(key) for key in keys] if local is not None else [None] * len(keys)
+        missing = [i for i, raw in enumerate(raws) if raw is None]
+        if missing and self._breaker.allow():
+            try:
+                responses = await self._cache_client.mget([self._get_key(keys[i]) for i in missing])
+            except self._read_errors as exc:
+                self._on_read_error(exc)
+                responses = [None] * len(missing)
+            else:
+                self._breaker.record_success()
+            for i, response in zip(missing, responses):
+                if (raw_value := self._raw_value(response)) is not None:
+                    raws[i] = raw_value
+                    if local is not None:
+                        local[keys[i]] = raw_value
+        return [self._deserialize(raw) if raw is not None else None for raw in raws]
+
+    async def set_many(self, pairs: Iterable[Tuple[str, T]], ttl_in_sec: Optional[int] = None) -> None:
+        """Store several model instances with concurrent writes."""
+        payloads = [(key, self._serialize(value)) for key, value in pairs]
+        await self._wait_pending(key for key, _ in payloads)
+        await self._cache_client.mset(
+            [(self._get_key(key), payload) for key, payload in payloads],
+            expiry_in_hours=self._sec_to_expiry_hours(ttl_in_sec),
+        )
+        if self._local is not None:
+            self._local.update(payloads)
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        """Remove several keys with concurrent deletes."""
+        keys = list(keys)
+        await self._wait_pending(keys)
+        if self._local is not None:
+            for key in keys:
+                self._local.pop(key, None)
+        await asyncio.gather(*(self._cache_client.delete(self._get_key(key)) for key in keys))
+
+    async def close(self) -> None:
         """Close the cache client and cleanup resources."""
-        self._cache_client.close()
-        if self._loop and not self._loop.is_closed():
-            self._loop.close()
+        await self.flush()
+        await self._cache_client.close()
 
-    def __enter__(self):
+    async def __aenter__(self):
         return self
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.close()
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+_write_behind_providers: list[CatalystCacheProvider] = []
+
+# Write tasks queued by CatalystCacheProvider.set() for the current request, installed
+# by CatalystWriteFlushMiddleware. None outside a request.
+_catalyst_writes_ctx: ContextVar[Optional[list[asyncio.Task]]] = ContextVar("_catalyst_writes_ctx", default=None)
+
+
+async def _flush_request_catalyst_writes() -> None:
+    """Wait for the current request's queued writes, raising the first failure."""
+    tasks = _catalyst_writes_ctx.get()
+    if tasks:
+        queued = tasks.copy()
+        tasks.clear()
+        await asyncio.gather(*queued)
+
+
+async def flush_catalyst_writes() -> None:
+    """Wait for the queued writes of every CatalystCacheProvider."""
+    await asyncio.gather(*(provider.flush() for provider in _write_behind_providers))
+
+
+async def close_catalyst_providers() -> None:
+    """Flush queued writes, then close the shared Catalyst clients; for shutdown."""
+    await flush_catalyst_writes()
+    # Providers on the same segment share one client, so each is closed once
+    clients = {id(provider._cache_client): provider._cache_client for provider in _write_behind_providers}
+    await asyncio.gather(*(client.close() for client in clients.values()))
+
+
+class CatalystWriteFlushMiddleware:
+    """
+    Holds each response until the Catalyst writes queued by its request have
+    landed, so a client following a redirect (possibly to another instance) sees
+    the stored state. A write that failed fails the request with a 500 instead
+    of reporting success for state that was never stored.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def flushing_send(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                await _flush_request_catalyst_writes()
+            await send(message)
+
+        token = _catalyst_writes_ctx.set([])
+        try:
+            await self.app(scope, receive, flushing_send)
+        finally:
+            _catalyst_writes_ctx.reset(token)
+
+
+# Stores whose Redis/Catalyst reads may be served from a short-lived per-process
+# cache. Registered clients are written once and read on every authorize/token
+# call; transactions and auth codes are single-use and must always hit the backend.
+_LOCALLY_CACHED_SCOPES = frozenset({"rc"})
+
+# Entry caps for the in-memory backend, so a burst of registrations or abandoned
+# authorization flows cannot grow the process without bound
+_IN_MEMORY_MAX_ENTRIES = {"ac": 10_000, "rc": 50_000, "ci": 50_000}
 
 
 class PersistenceFactory:
+    # (model_class, scope, backend) -> provider, so each store is built once per process
+    _instances: Dict[Tuple[type, str, str], PersistenceProvider] = {}
+
+    @classmethod
+    def create(cls, model_class: Type[T], scope: str) -> PersistenceProvider[T]:
+        key = (model_class, scope, Settings.STORAGE_BACKEND)
+        provider = cls._instances.get(key)
+        if provider is None:
+            provider = cls._instances.setdefault(key, cls._build(model_class, scope))
+        return provider
+
     @staticmethod
-    def create(model_class: Type[T], scope: str) -> PersistenceProvider[T]:
+    def _build(model_class: Type[T], scope: str) -> PersistenceProvider[T]:
         mode = Settings.STORAGE_BACKEND
         
         if mode == "redis":
@@ -217,7 +753,8 @@ class PersistenceFactory:
                 host=Settings.REDIS_HOST,
                 port=Settings.REDIS_PORT,
                 password=Settings.REDIS_PASSWORD,
-                prefix=scope
+                prefix=scope,
+                local_cache_ttl=Settings.REDIS_LOCAL_CACHE_TTL if scope in _LOCALLY_CACHED_SCOPES else 0,
             )
         
         if mode == "catalyst":
@@ -236,16 +773,7 @@ class PersistenceFactory:
                 cfg=cfg,
                 prefix=scope,
                 segment_id=Settings.CATALYST_CACHE_SEGMENT_ID,
+                local_cache_ttl=Settings.CATALYST_LOCAL_CACHE_TTL if scope in _LOCALLY_CACHED_SCOPES else 0,
             )
 
-        return InMemoryProvider(model_class=model_class)
-
-
-async def ttl_cleanup_task(provider: InMemoryProvider):
-    logger.debug(f"Starting TTL cleanup task for In-memory store")
-    while True:
-        try:
-            provider.cleanup_expired()
-        except Exception as e:
-            logger.info(f"Cleanup error: {e}")
-        await asyncio.sleep(60)
+        return InMemoryProvider(model_class=model_class, max_size=_IN_MEMORY_MAX_ENTRIES.get(scope))
@@ -1,96 +1,117 @@
-from abc import ABC, abstractmethod
 from dataclasses import dataclass
 import ipaddress
 import time
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 import asyncio
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Protocol
 from ..config import Settings
 from functools import lru_cache
 from fastapi import Request, HTTPException, status
-from ..sdk.redis_client import RedisClientSingleton
 from ..logging_util import get_logger
 from ipaddress import ip_address, ip_network
 
 
 logger = get_logger(__name__)
 
-class RateLimiter(ABC):
-    @abstractmethod
+class RateLimiter(Protocol):
     async def allow(self, key: str) -> bool:
-        pass
+        ...
+
+NS_PER_SECOND = 1_000_000_000
+
 
 @dataclass(slots=True)
 class _Bucket:
-    tokens: float
-    last_refill: float
-    last_access: float
+    tokens: int
+    # time.monotonic_ns() of the last allowed request. Rejections leave the bucket
+    # untouched: refill is recomputed from here on the next call, and idle expiry
+    # counts from here.
+    last_ts: int
 
 
-class InMemoryTokenBucketRateLimiter(RateLimiter):
+class InMemoryTokenBucketRateLimiter:
 
     __slots__ = (
         "capacity",
-        "refill_rate",
+        "token_cost",
+        "capacity_units",
         "entry_ttl_seconds",
+        "entry_ttl_ns",
+        "max_entries",
         "buckets",
     )
 
+    # Number of idle buckets evicted from the LRU head on each call to allow().
+    _EVICTIONS_PER_CALL = 2
+
     def __init__(
         self,
         capacity: int,
         window_seconds: int,
         entry_ttl_seconds: int = 3600,
+        max_entries: Optional[int] = None,
     ):
         self.capacity = capacity
-        self.refill_rate = capacity / window_seconds
+        # Tokens are counted in integer units scaled by the window length in ns: a
+        # request costs window_ns units and every elapsed ns refills `capacity` units.
+        # Refill is then exact integer arithmetic with no float rounding drift.
+        self.token_cost = int(window_seconds * NS_PER_SECOND)
+        self.capacity_units = capacity * self.token_cost
         self.entry_ttl_seconds = entry_ttl_seconds
-        self.buckets: Dict[str, _Bucket] = {}
+        self.entry_ttl_ns = int(entry_ttl_seconds * NS_PER_SECOND)
+        self.max_entries = max_entries
+        # Kept in least-recently-allowed order so idle buckets can be evicted from the head
+        self.buckets: OrderedDict[str, _Bucket] = OrderedDict()
+
+    def _evict_idle(self, now: int):
+        buckets = self.buckets
+        for _ in range(self._EVICTIONS_PER_CALL):
+            if not buckets:
+                return
+            oldest_key = next(iter(buckets))
+            if now - buckets[oldest_key].last_ts <= self.entry_ttl_ns:
+                return
+            del buckets[oldest_key]
 
     async def allow(self, key: str) -> bool:
         """
         Didn't use a lock here since In-Memory Rate Limiter is primarily intended for single-worker deployments and this async 
         function doesn't yield control during it's execution.
         """
-        now = time.monotonic()
-        bucket = self.buckets.get(key)
-        if bucket is None:
-            self.buckets[key] = _Bucket(
-                tokens=self.capacity - 1,
-                last_refill=now,
-                last_access=now,
-            )
-            return True
+        now = time.monotonic_ns()
+        self._evict_idle(now)
 
-        if now - bucket.last_access > self.entry_ttl_seconds:
-            bucket.tokens = self.capacity - 1
-            bucket.last_refill = now
-            bucket.last_access = now
+        buckets = self.buckets
+        capacity_units = self.capacity_units
+        cost = self.token_cost
+        bucket = buckets.get(key)
+        if bucket is None:
+            buckets[key] = _Bucket(tokens=capacity_units - cost, last_ts=now)
+            if self.max_entries is not None and len(buckets) > self.max_entries:
+                buckets.popitem(last=False)
             return True
 
-        delta = now - bucket.last_refill
-        if delta > 0:
-            bucket.tokens = min(
-                self.capacity,
-                bucket.tokens + delta * self.refill_rate,
-            )
-            bucket.last_refill = now
-
-        
-        if bucket.tokens < 1:
-            return False
-
-
-        bucket.last_access = now
-        bucket.tokens -= 1
+        delta = now - bucket.last_ts
+        if delta > self.entry_ttl_ns:
+            tokens = capacity_units
+        else:
+            tokens = bucket.tokens + delta * self.capacity
+            if tokens > capacity_units:
+                tokens = capacity_units
+            elif tokens < cost:
+                return False
+
+        bucket.tokens = tokens - cost
+        bucket.last_ts = now
+        buckets.move_to_end(key)
         return True
 
     def cleanup(self) -> int:
-        now = time.monotonic()
+        now = time.monotonic_ns()
         to_delete = [
             key
             for key, bucket in self.buckets.items()
-            if now - bucket.last_access > self.entry_ttl_seconds
+            if now - bucket.last_ts > self.entry_ttl_ns
         ]
 
         for key in to_delete:
@@ -105,10 +126,8 @@ local key = KEYS[1]
 local capacity = tonumber(ARGV[1])
 local refill_rate = tonumber(ARGV[2]) -- tokens per millisecond
 local requested = tonumber(ARGV[3])
-
--- Use Redis server time
-local now_data = redis.call("TIME")
-local now = now_data[1] * 1000 + math.floor(now_data[2] / 1000)
+-- Caller's wall clock in milliseconds; keeps the script deterministic
+local now = tonumber(ARGV[4])
 
 -- Get existing bucket
 local bucket = redis.call("HMGET", key, "tokens", "last_refill")
@@ -119,11 +138,12 @@ if tokens == nil then
     tokens = capacity
     last_refill = now
 else
-    -- Refill tokens
-    local delta = now - last_refill
+    -- Refill tokens. Clocks of different app hosts may disagree slightly, so
+    -- never let a caller that is behind move the refill origin backwards.
+    local delta = math.max(0, now - last_refill)
     local refill = delta * refill_rate
     tokens = math.min(capacity, tokens + refill)
-    last_refill = now
+    last_refill = math.max(now, last_refill)
 end
 
 local allowed = 0
@@ -134,7 +154,7 @@ if tokens >= requested then
 end
 
 -- Save state
-redis.call("HMSET", key,
+redis.call("HSET", key,
     "tokens", tokens,
     "last_refill", last_refill
 )
@@ -148,7 +168,7 @@ return allowed
 """
 
 
-class RedisTokenBucketRateLimiter(RateLimiter):
+class RedisTokenBucketRateLimiter:
     def __init__(self, redis_client, capacity: int, window_seconds: int):
         """
         capacity: max burst (e.g., 5 requests)
@@ -160,6 +180,7 @@ class RedisTokenBucketRateLimiter(RateLimiter):
         # refill_rate = tokens per millisecond
         self.refill_rate = capacity / (window_seconds * 1000)
 
+        # Script invocations go through EVALSHA and only resend the source on NOSCRIPT
         self.script = self.redis.register_script(TOKEN_BUCKET_SCRIPT)
 
     async def allow_tokens(self, key: str, tokens: int = 1) -> bool:
@@ -167,18 +188,45 @@ class RedisTokenBucketRateLimiter(RateLimiter):
 
         allowed = await self.script(
             keys=[key],
-            args=[self.capacity, self.refill_rate, tokens]
+            args=[self.capacity, self.refill_rate, tokens, int(time.time() * 1000)]
         )
 
         return bool(allowed)
 
 
+    async def allow_many(self, keys: List[str], tokens: int = 1) -> List[bool]:
+        """
+        Check several buckets in a single round trip.
+
+        Each bucket is still updated atomically by its own script invocation; the
+        pipeline only batches the network exchange, so no MULTI/EXEC is needed.
+        """
+        now_ms = int(time.time() * 1000)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                await self.script(
+                    keys=[f"rl:{key}"],
+                    args=[self.capacity, self.refill_rate, tokens, now_ms],
+                    client=pipe,
+                )
+            results = await pipe.execute()
+
+        return [bool(allowed) for allowed in results]
+
     async def allow(self, key: str) -> bool:
         return await self.allow_tokens(key)
     
 
 _rate_limiter_cache = {}
 _rate_limiter_lock = asyncio.Lock()
+# (capacity, window_seconds) pairs requested by rate_limit() dependencies, built at startup
+_registered_rate_limits: set[tuple[int, int]] = set()
+
+
+def get_cached_limiter(capacity: int, window_seconds: int) -> Optional[RateLimiter]:
+    """Return the limiter for this configuration if it has already been built."""
+    return _rate_limiter_cache.get((capacity, window_seconds))
+
 
 async def build_rate_limiter(capacity: int, window_seconds: int) -> RateLimiter:
     key = (capacity, window_seconds)
@@ -187,16 +235,19 @@ async def build_rate_limiter(capacity: int, window_seconds: int) -> RateLimiter:
     The double checked locking pattern might not be necessary here since this is an ASGI application
     but it's not harmful either. Keeping it here for an additional safety guarantee.
     """
-    if key in _rate_limiter_cache:
-        return _rate_limiter_cache[key]
+    limiter = _rate_limiter_cache.get(key)
+    if limiter is not None:
+        return limiter
 
     async with _rate_limiter_lock:
-        if key in _rate_limiter_cache:
-            return _rate_limiter_cache[key]
+        limiter = _rate_limiter_cache.get(key)
+        if limiter is not None:
+            return limiter
 
         backend = Settings.STORAGE_BACKEND
 
         if backend == "redis":
+            from ..sdk.redis_client import RedisClientSingleton
             redis_client = await RedisClientSingleton.get_client()
             limiter = RedisTokenBucketRateLimiter(
                 redis_client=redis_client,
@@ -213,6 +264,93 @@ async def build_rate_limiter(capacity: int, window_seconds: int) -> RateLimiter:
         return limiter
 
 
+async def build_registered_rate_limiters():
+    """Build the limiters of every rate_limit() dependency so requests never hit the cold path."""
+    for capacity, window_seconds in sorted(_registered_rate_limits):
+        await build_rate_limiter(capacity, window_seconds)
+
+
+_trusted_proxy_ranges_cache: tuple[object, tuple[tuple[int, int, int], ...]] = (None, ())
+
+
+def _trusted_proxy_ranges() -> tuple[tuple[int, int, int], ...]:
+    """
+    Return Settings.TRUSTED_PROXY_LIST as (ip_version, first, last) integer ranges.
+
+    The ranges are rebuilt only when the setting is replaced with a different list,
+    so request handling never re-parses the configured networks.
+    """
+    global _trusted_proxy_ranges_cache
+    networks = Settings.TRUSTED_PROXY_LIST
+    cached_for, ranges = _trusted_proxy_ranges_cache
+    if cached_for is not networks:
+        ranges = tuple(
+            (net.version, int(net.network_address), int(net.broadcast_address))
+            for net in (ip_network(n, strict=False) for n in networks)
+        )
+        _trusted_proxy_ranges_cache = (networks, ranges)
+        _resolve_client_ip.cache_clear()
+    return ranges
+
+
+def _is_trusted_proxy(ip: str, trusted_ranges: tuple[tuple[int, int, int], ...]) -> bool:
+    try:
+        addr = ip_address(ip)
+    except ValueError:
+        return False
+    version = addr.version
+    value = int(addr)
+    for range_version, first, last in trusted_ranges:
+        if range_version == version and first <= value <= last:
+            return True
+    return False
+
+
+@lru_cache(maxsize=4096)
+def _resolve_client_ip(
+    connecting_ip: str,
+    header_ip: str | None,
+    xff: str | None,
+    x_real_ip: str | None,
+) -> str:
+    """
+    Resolve the client IP from the connecting address and proxy headers.
+
+    Depends only on its arguments and the trusted proxy ranges, and the cache is
+    cleared whenever those ranges are rebuilt, so identical header combinations can
+    safely be served from cache.
+    """
+    if header_ip:
+        try:
+            ip_address(header_ip.strip())
+            return header_ip.strip()
+        except ValueError:
+            pass
+
+    trusted_ranges = _trusted_proxy_ranges_cache[1]
+    if trusted_ranges:
+
+        if not _is_trusted_proxy(connecting_ip, trusted_ranges):
+            return connecting_ip
+    
+        # Parse X-Forwarded-For: leftmost = original client, rightmost = last proxy
+        # Format: "client, proxy1, proxy2"
+        if xff:
+            # Walk from rightmost to leftmost, skipping trusted proxies,
+            # and return the first IP that is NOT in our trusted list.
+            ips = [ip.strip() for ip in xff.split(",")]
+            for ip in reversed(ips):
+                if not _is_trusted_proxy(ip, trusted_ranges):
+                    return ip
+
+    
+    # Fallback to X-Real-IP
+    if x_real_ip:
+        return x_real_ip
+    
+    return connecting_ip
+
+
 def get_client_ip(request: Request) -> str | None:
     """
     Extracts the client IP address based on application settings.
@@ -222,17 +360,6 @@ def get_client_ip(request: Request) -> str | None:
       connecting IP is in TRUSTED_PROXY_LIST, then walk the XFF chain
       to find the first non-private, non-trusted IP (the real client).
     """
-
-    def _is_trusted_proxy(ip: str) -> bool:
-        try:
-            addr = ip_address(ip)
-            for net in Settings.TRUSTED_PROXY_LIST:
-                if addr in ip_network(net):
-                    return True
-        except ValueError:
-            pass
-        return False
-    
     # def _is_public_ip(ip: str) -> bool:
     #     try:
     #         addr = ip_address(ip)
@@ -254,42 +381,17 @@ def get_client_ip(request: Request) -> str | None:
     if not Settings.BEHIND_PROXY:
         return connecting_ip
 
+    headers = request.headers
+    header_name = Settings.CLIENT_IP_HEADER
+    # Refreshes the ranges (and invalidates resolved IPs) if the proxy list changed
+    _trusted_proxy_ranges()
 
-    if Settings.CLIENT_IP_HEADER:
-
-        header_name = Settings.CLIENT_IP_HEADER
-        ip = request.headers.get(header_name)
-        if ip:
-            try:
-                ip_address(ip.strip())
-                return ip.strip()
-            except ValueError:
-                pass
-
-    
-    if Settings.TRUSTED_PROXY_LIST:
-
-        if not _is_trusted_proxy(connecting_ip):
-            return connecting_ip
-    
-        # Parse X-Forwarded-For: leftmost = original client, rightmost = last proxy
-        # Format: "client, proxy1, proxy2"
-        xff = request.headers.get("X-Forwarded-For")
-        if xff:
-            # Walk from rightmost to leftmost, skipping trusted proxies,
-            # and return the first IP that is NOT in our trusted list.
-            ips = [ip.strip() for ip in xff.split(",")]
-            for ip in reversed(ips):
-                if not _is_trusted_proxy(ip):
-                    return ip
-
-    
-    # Fallback to X-Real-IP
-    x_real_ip = request.headers.get("X-Real-IP")
-    if x_real_ip:
-        return x_real_ip
-    
-    return connecting_ip
+    return _resolve_client_ip(
+        connecting_ip,
+        headers.get(header_name) if header_name else None,
+        headers.get("X-Forwarded-For"),
+        headers.get("X-Real-IP"),
+    )
 
 
 def _is_ip_trusted(client_ip: str) -> bool:
@@ -302,7 +404,7 @@ def _is_ip_trusted(client_ip: str) -> bool:
             if ip_obj in network:
                 return True
     except ValueError:
-        logger.warning(f"Invalid client IP address: {client_ip}")
+        logger.warning("Invalid client IP address: %s", client_ip)
         return False
 
     return False
@@ -332,8 +434,17 @@ def _is_domain_trusted(request: Request) -> bool:
 
 def rate_limit(capacity: int, window_seconds: int):
 
+    _registered_rate_limits.add((capacity, window_seconds))
+    # Bound on first use; the limiter for a given configuration never changes afterwards
+    limiter: Optional[RateLimiter] = None
+
     async def dependency(request: Request):
-        limiter: RateLimiter = await build_rate_limiter(capacity, window_seconds)
+        nonlocal limiter
+        if limiter is None:
+            limiter = (
+                get_cached_limiter(capacity, window_seconds)
+                or await build_rate_limiter(capacity, window_seconds)
+            )
         client_ip = get_client_ip(request)
 
         if not client_ip:
@@ -373,9 +484,7 @@ def rate_limit(capacity: int, window_seconds: int):
             )
 
 
-        key = f"{path}:{client_ip}"
-
-        allowed = await limiter.allow(key)
+        allowed = await limiter.allow(path + ":" + client_ip)
 
         if not allowed:
             logger.info(
@@ -405,11 +514,11 @@ def scenario_registration_rate_limit():
 
 
 async def rate_limiter_cleanup_task(limiter: InMemoryTokenBucketRateLimiter, interval_seconds: int = 60):
-    logger.info(f"Starting rate limiter cleanup task with interval {interval_seconds} seconds.")
+    logger.info("Starting rate limiter cleanup task with interval %s seconds.", interval_seconds)
     try:
         while True:
             removed = limiter.cleanup()
-            logger.info(f"Rate limiter cleanup: removed {removed} expired buckets.")
+            logger.info("Rate limiter cleanup: removed %s expired buckets.", removed)
             await asyncio.sleep(interval_seconds)
     except asyncio.CancelledError:
         logger.info("Rate limiter cleanup task cancelled.")
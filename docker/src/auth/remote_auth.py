@@ -33,23 +33,28 @@ with the static limitations of the Zoho Accounts provider.
 
 
 from fastapi import Request, status, HTTPException, Query, Form, APIRouter, Depends
-from fastapi.responses import RedirectResponse, HTMLResponse, JSONResponse
-from src.config import Settings, get_analytics_client_instance
+from fastapi.responses import RedirectResponse, HTMLResponse, ORJSONResponse, Response
+from src.config import Settings, is_well_formed_bearer_token
 from urllib.parse import urljoin, urlencode, urlparse, urlunparse, parse_qsl, urlunsplit
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
 from starlette.status import HTTP_401_UNAUTHORIZED
 import secrets
-from pydantic import BaseModel, AnyUrl, Field, RootModel, field_validator, ConfigDict
+import time
+from pydantic import BaseModel, Field, RootModel, field_validator, ConfigDict
 from typing import Literal, Optional, Dict, List
-from datetime import datetime, timedelta, timezone, UTC
+from datetime import datetime, timedelta, UTC
 import uuid
-from html import escape 
 import httpx
+import orjson
+import jwt
 from src.logging_util import get_logger
 import asyncio
 from fastapi.responses import FileResponse
 import base64, hashlib, hmac, re
 from src.auth.persistence import PersistenceFactory
+from cachetools import TTLCache
+from functools import lru_cache
+from dataclasses import dataclass
 from fastapi.templating import Jinja2Templates
 from src.auth.rate_limiter import (
     RateLimiter,
@@ -64,7 +69,7 @@ logger = get_logger(__name__)
 authRouter = APIRouter()
 
 
-UNAUTHENTICATED_PATHS = {
+UNAUTHENTICATED_PATHS = frozenset({
     "/register",
     "/authorize",
     "/consent",
@@ -74,7 +79,7 @@ UNAUTHENTICATED_PATHS = {
     "/token",
     "/favicon.ico",
     "/",
-}
+})
 
 
 UNAUTHENTICATED_PREFIXES = (
@@ -82,6 +87,171 @@ UNAUTHENTICATED_PREFIXES = (
     "/static/"
 )
 
+
+@dataclass(frozen=True)
+class _URLs:
+    """The proxy's public URLs; fixed once the settings are loaded."""
+    base: str
+    mcp: str
+    protected_resource_metadata: str
+    authorize: str
+    token: str
+    register: str
+    revoke: str
+    consent: str
+    proxy_callback: str
+
+
+@lru_cache(maxsize=1)
+def _urls() -> _URLs:
+    base = Settings.MCP_SERVER_PUBLIC_URL.rstrip("/") + "/"
+    return _URLs(
+        base=base,
+        mcp=urljoin(base, "mcp"),
+        protected_resource_metadata=urljoin(base, ".well-known/oauth-protected-resource"),
+        authorize=urljoin(base, "authorize"),
+        token=urljoin(base, "token"),
+        register=urljoin(base, "register"),
+        revoke=urljoin(base, "revoke"),
+        consent=urljoin(base, "consent"),
+        proxy_callback=urljoin(base, "auth/callback"),
+    )
+
+
+@dataclass(frozen=True)
+class _UpstreamEndpoints:
+    authorize: str
+    token: str
+    orgs: str
+
+
+@lru_cache(maxsize=1)
+def _upstream() -> _UpstreamEndpoints:
+    """Upstream endpoints, checked once; bearer tokens and client secrets are sent to them."""
+    accounts = Settings.oidc_provider_base_url().rstrip("/") + "/"
+    analytics = Settings.ANALYTICS_SERVER_URL.rstrip("/")
+    for name, url in (("Accounts server URL", accounts), ("ANALYTICS_SERVER_URL", analytics)):
+        parsed = urlparse(url)
+        if parsed.scheme != "https" or not parsed.hostname:
+            raise RuntimeError(f"{name} must be an https:// URL, got {url!r}")
+    return _UpstreamEndpoints(
+        authorize=urljoin(accounts, "oauth/v2/auth"),
+        token=urljoin(accounts, "oauth/v2/token"),
+        orgs=analytics + "/restapi/v2/orgs",
+    )
+
+
+# The discovery documents only depend on settings, so each is serialized once
+@lru_cache(maxsize=1)
+def _protected_resource_metadata() -> bytes:
+    urls = _urls()
+    return orjson.dumps({
+        "resource": urls.mcp,
+        "authorization_servers": [
+            urls.base
+        ],
+        "scopes_supported": [
+            Settings.OAUTH_DEFAULT_SCOPE
+        ],
+        "bearer_methods_supported": [
+            "header"
+        ]
+    })
+
+
+@lru_cache(maxsize=1)
+def _authorization_server_metadata() -> bytes:
+    urls = _urls()
+    return orjson.dumps({
+        "issuer": urls.base,
+        "authorization_endpoint": urls.authorize,
+        "token_endpoint": urls.token,
+        "registration_endpoint": urls.register,
+        "scopes_supported": [
+            Settings.OAUTH_DEFAULT_SCOPE,
+            Settings.OAUTH_OFFLINE_ACCESS_SCOPE
+        ],
+        "response_types_supported": [
+            "code"
+        ],
+        "grant_types_supported": [
+            "authorization_code",
+            "refresh_token"
+        ],
+        "token_endpoint_auth_methods_supported": [
+            "client_secret_post"
+        ],
+        "revocation_endpoint": urls.revoke,
+        "revocation_endpoint_auth_methods_supported": [
+            "client_secret_post"
+        ],
+        "code_challenge_methods_supported": [
+            "S256"
+        ]
+    })
+
+
+@lru_cache(maxsize=4096)
+def _is_public_path(path: str) -> bool:
+    return path in UNAUTHENTICATED_PATHS or path.startswith(UNAUTHENTICATED_PREFIXES)
+
+
+# sha256 of a bearer token -> True, for tokens that recently passed the org check in
+# AuthMiddleware. A revoked token keeps being accepted until its entry expires.
+_validated_tokens: TTLCache = TTLCache(maxsize=10_000, ttl=Settings.OAUTH_TOKEN_VALIDATION_CACHE_TTL)
+
+# sha256 of a redeemed authorization code -> (client_id, sha256 of the PKCE verifier,
+# upstream exchange task). A client that retries the code shortly after (network blip,
+# double submit) shares the first exchange instead of getting invalid_grant, and the
+# IdP is called once.
+_recent_code_exchanges: TTLCache = TTLCache(maxsize=10_000, ttl=Settings.OAUTH_CODE_EXCHANGE_REPLAY_TTL)
+
+# Connection pool for upstream calls made on the request path, created on first use
+_upstream_http: Optional[httpx.AsyncClient] = None
+
+
+def _get_upstream_http() -> httpx.AsyncClient:
+    global _upstream_http
+    if _upstream_http is None:
+        _upstream_http = httpx.AsyncClient(
+            http2=True,
+            timeout=5.0,
+            limits=httpx.Limits(
+                max_connections=200,
+                max_keepalive_connections=100,
+                keepalive_expiry=300.0,
+            ),
+        )
+    return _upstream_http
+
+
+def open_upstream_http() -> None:
+    """Validate the upstream endpoints and open the shared client. Called on app startup,
+    so a misconfigured upstream fails the boot instead of the first login."""
+    _upstream()
+    _get_upstream_http()
+
+
+async def close_upstream_http() -> None:
+    """Close the shared upstream client, if one was opened. Called on app shutdown."""
+    global _upstream_http
+    if _upstream_http is not None:
+        client, _upstream_http = _upstream_http, None
+        await client.aclose()
+
+
+async def _fetch_user_orgs(token: str) -> list:
+    """Organizations the token can access, fetched without blocking the event loop."""
+    response = await _get_upstream_http().get(
+        _upstream().orgs,
+        headers={
+            "Authorization": "Zoho-oauthtoken " + token,
+            "User-Agent": "zoho-analytics-mcp-server",
+        },
+    )
+    response.raise_for_status()
+    return response.json()["data"]["orgs"]
+
 ALLOWED_GRANT_TYPES = {"authorization_code", "refresh_token"}
 ALLOWED_RESPONSE_TYPES = {"code"}
 
@@ -181,7 +351,9 @@ class AuthorizationTransaction(BaseModel):
     created_at: datetime
     expires_at: datetime
     client_id: str
-    redirect_uri: AnyUrl
+    # Plain str: /authorize only accepts a URI registered by the client, so it is
+    # never parsed again, and the client gets back exactly what it registered
+    redirect_uri: str
     scope: str
     state: Optional[str] = None
     code_challenge: Optional[str] = None
@@ -193,7 +365,7 @@ class AuthorizationCode(BaseModel):
     expires_at: datetime
     transaction_id: str
     client_id: str
-    redirect_uri: AnyUrl
+    redirect_uri: str
     code_challenge: Optional[str] = None
     code_challenge_method: Optional[str] = None
     upstream_location: str
@@ -203,6 +375,58 @@ class StringList(RootModel[list[str]]):
     root: list[str]
 
 
+# Authorization transactions are not stored: the transaction_id handed to the
+# browser (and to the upstream provider as `state`) is a signed JWT carrying the
+# transaction itself, so any replica can continue the flow.
+_TXN_JWT_ALGORITHM = "HS256"
+# Room for the signed claims of the longest accepted redirect_uri and state
+_MAX_TRANSACTION_ID_LENGTH = 4096
+
+
+def _encode_transaction(txn: AuthorizationTransaction) -> str:
+    claims = {
+        "cid": txn.client_id,
+        "ruri": txn.redirect_uri,
+        "scope": txn.scope,
+        "state": txn.state,
+        "cc": txn.code_challenge,
+        "ccm": txn.code_challenge_method,
+        "iat": int(txn.created_at.timestamp()),
+        "exp": int(txn.expires_at.timestamp()),
+    }
+    return jwt.encode(
+        {k: v for k, v in claims.items() if v is not None},
+        Settings.OAUTH_TRANSACTION_SIGNING_KEY,
+        algorithm=_TXN_JWT_ALGORITHM,
+    )
+
+
+def _decode_transaction(transaction_id: str) -> Optional[AuthorizationTransaction]:
+    """The transaction signed into transaction_id, or None if it is not a valid one.
+
+    Expiry is left to the callers, which report it separately.
+    """
+    try:
+        claims = jwt.decode(
+            transaction_id,
+            Settings.OAUTH_TRANSACTION_SIGNING_KEY,
+            algorithms=[_TXN_JWT_ALGORITHM],
+            options={"verify_exp": False, "require": ["cid", "ruri", "scope", "iat", "exp"]},
+        )
+    except jwt.InvalidTokenError:
+        return None
+    return AuthorizationTransaction(
+        created_at=datetime.fromtimestamp(claims["iat"], UTC),
+        expires_at=datetime.fromtimestamp(claims["exp"], UTC),
+        client_id=claims["cid"],
+        redirect_uri=claims["ruri"],
+        scope=claims["scope"],
+        state=claims.get("state"),
+        code_challenge=claims.get("cc"),
+        code_challenge_method=claims.get("ccm"),
+    )
+
+
 # REGISTERED_CLIENTS acts as an in-memory registry for all dynamically
 # “created” OAuth clients. Since the upstream Zoho Accounts provider
 # supports only Static Client Registration, the proxy must locally
@@ -228,12 +452,16 @@ type code_type = str
 Any store added here should also be added to the `stores` list in server lifespan events to ensure proper cleanup.
 """
 registed_clients_store = PersistenceFactory.create(DynamicClientRegistrationRequest, scope="rc")
-auth_transactions_store = PersistenceFactory.create(AuthorizationTransaction, scope="at")
 auth_codes_store = PersistenceFactory.create(AuthorizationCode, scope="ac")
 client_ip_vs_client_ids_store = PersistenceFactory.create(StringList, scope="ci")
 
 
-class AuthMiddleware(BaseHTTPMiddleware):
+def _auth_code_key(code: str) -> str:
+    # Codes are stored under their sha256 so a dump of the store cannot be replayed at /token
+    return hashlib.sha256(code.encode()).hexdigest()
+
+
+class AuthMiddleware:
     """
     Middleware to handle Bearer Token authentication for protected API routes.
 
@@ -241,34 +469,44 @@ class AuthMiddleware(BaseHTTPMiddleware):
     For protected routes, it validates the Authorization header and attempts to
     validate the token by making an external call.
 
-    Raises:
-        HTTPException: 401 Unauthorized if the token is missing, invalid, or expired.
+    Implemented as plain ASGI rather than BaseHTTPMiddleware, so accepted requests
+    go straight to the app without extra tasks or wrapped response streams.
+
+    Responds with 401 Unauthorized if the token is missing, invalid, or expired.
     """
 
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-    def _unauthorized_response(self, detail: str, error: str = "unauthorized") -> JSONResponse:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        rejection = await self._authenticate(Request(scope, receive))
+        if rejection is not None:
+            await rejection(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+    def _unauthorized_response(self, detail: str, error: str = "unauthorized") -> ORJSONResponse:
         """Constructs the standardized 401 Unauthorized JSON response."""
-        try:
-            base = Settings.MCP_SERVER_PUBLIC_URL.rstrip("/") + "/"
-        except NameError:
-            base = "/" 
-            
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=HTTP_401_UNAUTHORIZED,
             content={"error": error, "error_description": detail},
             headers={
                 "WWW-Authenticate": 
-                    f'Bearer realm="OAuth", resource_metadata="{urljoin(base, ".well-known/oauth-protected-resource")}"'
+                    f'Bearer realm="OAuth", resource_metadata="{_urls().protected_resource_metadata}"'
             }
         )
 
     
-    async def dispatch(self, request: Request, call_next):
+    async def _authenticate(self, request: Request) -> Optional[Response]:
+        """Returns the response rejecting the request, or None to let it through."""
 
         rate_limiter: RateLimiter = request.app.state.global_rate_limiter
         client_ip = get_client_ip(request)
         if not client_ip:
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 content="Unable to determine client IP for rate limiting.",
             )
@@ -278,73 +516,82 @@ class AuthMiddleware(BaseHTTPMiddleware):
             we also want to have a global rate limiter to prevent overall abuse.
             Hence, using the global_rate_limiter for all requests regardless of the endpoint.
             """
-            logger.warning(f"Rate limit exceeded for IP: {client_ip}")
-            return JSONResponse(
+            logger.warning("Rate limit exceeded for IP: %s", client_ip)
+            return ORJSONResponse(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 content="Rate limit exceeded. Try again later.",
             )
 
 
         path = request.url.path
-        if path in UNAUTHENTICATED_PATHS or path.startswith(UNAUTHENTICATED_PREFIXES):
-            logger.debug(f"Bypassing authentication for path: {path}")
-            return await call_next(request)
+        if _is_public_path(path):
+            logger.debug("Bypassing authentication for path: %s", path)
+            return None
 
         auth_header = request.headers.get("Authorization")
         if not auth_header:
-            logger.warning(f"Missing Authorization header for path: {path}")
+            logger.warning("Missing Authorization header for path: %s", path)
             return self._unauthorized_response("Missing Authorization header")
 
         try:
-            scheme, token = auth_header.split()
+            # partition instead of split: no list, and exactly one separator is honoured
+            scheme, _, token = auth_header.partition(" ")
             if scheme.lower() != "bearer":
-                logger.warning(f"Invalid authorization scheme for path: {path}")
+                logger.warning("Invalid authorization scheme for path: %s", path)
                 return self._unauthorized_response("Authorization scheme must be Bearer")
             if not token:
-                logger.warning(f"Empty token value for path: {path}")
+                logger.warning("Empty token value for path: %s", path)
                 return self._unauthorized_response("Token value is empty")
+            # Same rule as get_access_token, so a header passing here is never
+            # rejected by the tools (extra spaces, tabs, non-ASCII)
+            if not is_well_formed_bearer_token(token):
+                raise ValueError("Malformed bearer token")
             
-            analytics_client = get_analytics_client_instance(token)
-            orgs = await asyncio.to_thread(analytics_client.get_orgs)
-
-            allowed_org_ids = Settings.get_allowed_org_ids()
-            if not allowed_org_ids:
-                logger.error("MCP_SERVER_ORG_ID is not properly configured on the server")
-                return self._unauthorized_response(
-                    detail="Server misconfiguration: MCP_SERVER_ORG_ID is not set or empty",
-                    error="server_misconfigured",
-                )
+            token_key = hashlib.sha256(token.encode()).digest()
+            # Tokens that passed recently skip the upstream org lookup
+            if token_key not in _validated_tokens:
+                orgs = await _fetch_user_orgs(token)
+
+                allowed_org_ids = Settings.get_allowed_org_ids()
+                if not allowed_org_ids:
+                    logger.error("MCP_SERVER_ORG_ID is not properly configured on the server")
+                    return self._unauthorized_response(
+                        detail="Server misconfiguration: MCP_SERVER_ORG_ID is not set or empty",
+                        error="server_misconfigured",
+                    )
             
-            try:
-                user_org_ids = {str(o.get("orgId")) for o in (orgs or []) if isinstance(o, dict) and o.get("orgId") is not None}
-            except Exception:
-                logger.warning(f"Unexpected orgs structure returned for path: {path}")
-                return self._unauthorized_response(
-                    detail="Unable to validate organization access for token",
-                    error="invalid_token",
-                )
+                try:
+                    user_org_ids = {str(o.get("orgId")) for o in (orgs or []) if isinstance(o, dict) and o.get("orgId") is not None}
+                except Exception:
+                    logger.warning("Unexpected orgs structure returned for path: %s", path)
+                    return self._unauthorized_response(
+                        detail="Unable to validate organization access for token",
+                        error="invalid_token",
+                    )
             
-            has_access = any(allowed_org in user_org_ids for allowed_org in allowed_org_ids)
-            if not has_access:
-                logger.warning(
-                    f"Token does not have access to any allowed MCP server orgs. "
-                    f"path={path} allowed_orgs={allowed_org_ids} user_orgs={list(user_org_ids)}"
-                )
-                return self._unauthorized_response(
-                    detail="Token is not authorized for any of the required organizations",
-                    error="invalid_token",
-                )          
-
-            logger.debug(f"Token validated successfully for path: {path}")
+                has_access = not allowed_org_ids.isdisjoint(user_org_ids)
+                if not has_access:
+                    logger.warning(
+                        "Token does not have access to any allowed MCP server orgs. "
+                        "path=%s allowed_orgs=%s user_orgs=%s",
+                        path, allowed_org_ids, list(user_org_ids),
+                    )
+                    return self._unauthorized_response(
+                        detail="Token is not authorized for any of the required organizations",
+                        error="invalid_token",
+                    )          
+
+                _validated_tokens[token_key] = True
+            logger.debug("Token validated successfully for path: %s", path)
             
         except ValueError:
-            logger.warning(f"Invalid Authorization header format for path: {path}")
+            logger.warning("Invalid Authorization header format for path: %s", path)
             return self._unauthorized_response(detail="Invalid Authorization header format", error="invalid_token")
 
         except Exception as e:
-            logger.error(f"Token validation failed for path: {path}", exc_info=True)
+            logger.error("Token validation failed for path: %s", path, exc_info=True)
             return self._unauthorized_response(detail="Invalid or expired token", error="invalid_token")
-        return await call_next(request)
+        return None
 
 
 
@@ -352,7 +599,7 @@ class AuthMiddleware(BaseHTTPMiddleware):
 def index(request: Request):
     context = {
         "request": request,
-        "mcp_url": Settings.MCP_SERVER_PUBLIC_URL.rstrip("/") + "/mcp"
+        "mcp_url": _urls().mcp
     }
     return templates.TemplateResponse(request=request, name="index.html", context=context)
 
@@ -369,19 +616,7 @@ async def oauth_protected_resource():
     acting as the access point and intermediary for the MCP Clients.
     """
     logger.debug("Serving OAuth protected resource metadata")
-    base = Settings.MCP_SERVER_PUBLIC_URL.rstrip("/") + "/"
-    return {
-        "resource": urljoin(base,"mcp"),
-        "authorization_servers": [
-            base
-        ],
-        "scopes_supported": [
-            Settings.OAUTH_DEFAULT_SCOPE
-        ],
-        "bearer_methods_supported": [
-            "header"
-        ]
-    }
+    return Response(content=_protected_resource_metadata(), media_type="application/json")
 
 
 @authRouter.get("/.well-known/oauth-authorization-server")
@@ -394,34 +629,7 @@ async def oauth_authorization_server():
     - The MCP Clients interact only with these endpoints.
     """
     logger.debug("Serving OAuth authorization server metadata")
-    base = Settings.MCP_SERVER_PUBLIC_URL.rstrip("/") + "/"
-    return {
-        "issuer": base,
-        "authorization_endpoint": urljoin(base, "authorize"),
-        "token_endpoint": urljoin(base, "token"),
-        "registration_endpoint": urljoin(base, "register"),
-        "scopes_supported": [
-            Settings.OAUTH_DEFAULT_SCOPE,
-            Settings.OAUTH_OFFLINE_ACCESS_SCOPE
-        ],
-        "response_types_supported": [
-            "code"
-        ],
-        "grant_types_supported": [
-            "authorization_code",
-            "refresh_token"
-        ],
-        "token_endpoint_auth_methods_supported": [
-            "client_secret_post"
-        ],
-        "revocation_endpoint": urljoin(base, "revoke"),
-        "revocation_endpoint_auth_methods_supported": [
-            "client_secret_post"
-        ],
-        "code_challenge_methods_supported": [
-            "S256"
-        ]
-    }
+    return Response(content=_authorization_server_metadata(), media_type="application/json")
 
 
 @authRouter.post(
@@ -442,21 +650,20 @@ async def register_client(payload: DynamicClientRegistrationRequest, request: Re
     The generated credentials are owned and managed by the proxy, ensuring the upstream 
     Static Client ID/Secret remains protected and never exposed.
     """
-    logger.info(f"Received client registration request with client_name: {payload.client_name}")
+    logger.info("Received client registration request with client_name: %s", payload.client_name)
 
     client_ip = get_client_ip(request)
     if not client_ip:
         logger.warning("Unable to determine client IP for incoming registration request")
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
             content={"error": "Unable to determine client IP for registration request"}
         )
 
     client_id = str(uuid.uuid4())
     client_secret = secrets.token_urlsafe(32)
-    base = Settings.MCP_SERVER_PUBLIC_URL.rstrip("/") + "/"
 
-    registed_clients_store.set(client_id,
+    await registed_clients_store.set(client_id,
         DynamicClientRegistrationRequest(
             redirect_uris=payload.redirect_uris or [],
             client_name=payload.client_name,
@@ -466,18 +673,18 @@ async def register_client(payload: DynamicClientRegistrationRequest, request: Re
             secret=client_secret
         )
     , ttl_in_sec=Settings.OAUTH_REGISTERED_CLIENTS_TTL)
-    logger.info(f"Client registered successfully: client_id={client_id}, client_name={payload.client_name}")
+    logger.info("Client registered successfully: client_id=%s, client_name=%s", client_id, payload.client_name)
 
 
     """
     This might not be the most efficient way to limiting the number of active clients per IP, but given the limits, it should be sufficient and won't cause performance issues.
     """
-    stored = client_ip_vs_client_ids_store.get(client_ip)
+    stored = await client_ip_vs_client_ids_store.get(client_ip)
     client_ids: list[str] = stored.root if stored else []
     client_ids.append(client_id)
     max_clients = Settings.get_max_clients_per_ip()
     if max_clients is None:
-        client_ip_vs_client_ids_store.set(
+        await client_ip_vs_client_ids_store.set(
             client_ip,
             StringList(root=client_ids),
             ttl_in_sec=Settings.OAUTH_CLIENT_IP_MAPPING_TTL
@@ -485,25 +692,26 @@ async def register_client(payload: DynamicClientRegistrationRequest, request: Re
     else:
         client_ids_to_remove = client_ids[:-max_clients]  # remove oldest beyond limit
         client_ids = client_ids[-max_clients:]
-        client_ip_vs_client_ids_store.set(
+        await client_ip_vs_client_ids_store.set(
             client_ip,
             StringList(root=client_ids),
             ttl_in_sec=Settings.OAUTH_CLIENT_IP_MAPPING_TTL
         )
-        for old_id in client_ids_to_remove:
-            registed_clients_store.delete(old_id)
-            logger.info(f"Removed old client_id {old_id} for IP {client_ip} …")
+        if client_ids_to_remove:
+            await registed_clients_store.delete_many(client_ids_to_remove)
+            for old_id in client_ids_to_remove:
+                logger.info("Removed old client_id %s for IP %s …", old_id, client_ip)
 
-    return JSONResponse(content={
+    return ORJSONResponse(content={
         "client_id": client_id,
         "client_secret": client_secret,
-        "client_id_issued_at": int(__import__("time").time()),
+        "client_id_issued_at": time.time_ns() // 1_000_000_000,
         "token_endpoint_auth_method": "client_secret_post",
         "redirect_uris": payload.redirect_uris or [],
         "grant_types": payload.grant_types or ["authorization_code", "refresh_token"],
         "response_types": payload.response_types or ["code"],
         "scope": Settings.OAUTH_DEFAULT_SCOPE,
-        "registration_client_uri": base + f"register/{client_id}",
+        "registration_client_uri": f"{_urls().register}/{client_id}",
         "registration_access_token": secrets.token_urlsafe(32)
     }, status_code=status.HTTP_200_OK)
 
@@ -512,9 +720,14 @@ def build_url_with_params(base_uri: str, params: dict[str, str | None]) -> str:
     """
     Append or merge query parameters into base_uri.
     """
+    filtered = {k: v for k, v in params.items() if v is not None}
+    # Our own consent and upstream endpoints carry no query or fragment, so
+    # there is nothing to merge and the URL need not be parsed
+    if "?" not in base_uri and "#" not in base_uri:
+        return f"{base_uri}?{urlencode(filtered)}" if filtered else base_uri
     url = urlparse(base_uri)
     query = dict(parse_qsl(url.query))
-    query.update({k: v for k, v in params.items() if v is not None})
+    query.update(filtered)
     new_query = urlencode(query)
     new_url = url._replace(query=new_query)
     return urlunparse(new_url)
@@ -566,12 +779,12 @@ async def authorize(
     2. Redirect Validation: Ensures the provided `redirect_uri` matches a 
        registered URI for the authenticated client.
        
-    3. Transaction State Storage: All incoming request parameters (including 
-       `scope`, `state`, and PKCE parameters) are temporarily stored in memory 
-       under a unique `transaction_id`.
+    3. Transaction State: All incoming request parameters (including 
+       `scope`, `state`, and PKCE parameters) are signed into a short-lived JWT
+       that serves as the `transaction_id`; nothing is stored server-side.
     4. Consent Redirection: The user agent is redirected to the proxy's internal 
-       `/consent` page, using the `transaction_id` (`txid`) to retrieve the stored 
-       request details upon user approval.
+       `/consent` page, carrying the `transaction_id` from which the request
+       details are recovered upon user approval.
 
     Architectural Role: This endpoint strictly handles the MCP Client's request 
     validation and state management. It is designed to prepare the request before it 
@@ -579,20 +792,18 @@ async def authorize(
     endpoint (a step handled *after* user consent).
     """
 
-    client : DynamicClientRegistrationRequest = registed_clients_store.get(client_id)
+    client : DynamicClientRegistrationRequest = await registed_clients_store.get(client_id)
     if not client:
-        logger.warning(f"Authorization request with invalid client_id: {client_id}")
+        logger.warning("Authorization request with invalid client_id: %s", client_id)
         return FileResponse("static/invalid_token.html", media_type="text/html", status_code=401)
 
     if redirect_uri not in (client.redirect_uris or []):
-        logger.warning(f"Authorization request with invalid redirect_uri for client_id: {client_id}")
+        logger.warning("Authorization request with invalid redirect_uri for client_id: %s", client_id)
         raise HTTPException(status_code=400, detail="invalid_redirect_uri")
     
-    logger.info(f"Creating authorization transaction for client_id: {client_id}")
-    transaction_id = str(uuid.uuid4())
+    logger.info("Creating authorization transaction for client_id: %s", client_id)
     now = datetime.now(UTC)
-    auth_transactions_store.set(
-        transaction_id,
+    transaction_id = _encode_transaction(
         AuthorizationTransaction(
             created_at=now,
             expires_at=now + timedelta(seconds=Settings.OAUTH_AUTH_TRANSACTION_TTL),
@@ -602,18 +813,14 @@ async def authorize(
             state=state,
             code_challenge=code_challenge,
             code_challenge_method=code_challenge_method,
-        ),
-        ttl_in_sec=Settings.OAUTH_AUTH_TRANSACTION_TTL
+        )
     )
 
-    base = Settings.MCP_SERVER_PUBLIC_URL.rstrip("/") + "/"
-    consent_base = urljoin(base, "consent")
-
-    consent_url = build_url_with_params(consent_base, {
+    consent_url = build_url_with_params(_urls().consent, {
         "transaction_id": transaction_id,
     })
 
-    logger.debug(f"Redirecting to consent page for transaction_id: {transaction_id}")
+    logger.debug("Redirecting to consent page for transaction_id: %s", transaction_id)
     return RedirectResponse(url=consent_url, status_code=302)
 
 
@@ -629,7 +836,10 @@ def validate_csrf_token(request: Request, form_token: str):
     """Validates the token from the form against the token in the session."""
     session_token = request.session.get("csrf_token")
     
-    if not session_token or not form_token or session_token != form_token:
+    # Constant-time compare on bytes, as for the client secret at /token
+    if not session_token or not form_token or not hmac.compare_digest(
+        session_token.encode(), form_token.encode()
+    ):
         request.session.pop("csrf_token", None)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, 
@@ -640,42 +850,38 @@ def validate_csrf_token(request: Request, form_token: str):
 
 templates = Jinja2Templates(directory="src/templates")
 
+_CONSENT_PAGE_CONSTANTS = {
+    "app_name": "Model Context Protocol (MCP) Host Application",
+    "upstream_provider": "Zoho Accounts",
+}
+
 @authRouter.get("/consent", response_class=HTMLResponse, dependencies=[Depends(scenario_standard_rate_limit())])
-async def consent(request: Request, transaction_id: str = Query(..., max_length=100)):
-    logger.debug(f"Consent page requested for transaction_id: {transaction_id}")
-    txn: AuthorizationTransaction = auth_transactions_store.get(transaction_id)
+async def consent(request: Request, transaction_id: str = Query(..., max_length=_MAX_TRANSACTION_ID_LENGTH)):
+    logger.debug("Consent page requested for transaction_id: %s", transaction_id)
+    txn = _decode_transaction(transaction_id)
     if not txn:
-        logger.warning(f"Invalid or missing transaction for transaction_id: {transaction_id}")
+        logger.warning("Invalid or missing transaction for transaction_id: %s", transaction_id)
         raise HTTPException(status_code=400, detail="invalid_transaction")
 
-    if txn.expires_at < datetime.now(timezone.utc):
-        logger.warning(f"Expired transaction for transaction_id: {transaction_id}")
-        auth_transactions_store.delete(transaction_id)
+    if txn.expires_at < datetime.now(UTC):
+        logger.warning("Expired transaction for transaction_id: %s", transaction_id)
         raise HTTPException(status_code=400, detail="transaction_expired")
 
-    
-    client_id = escape(txn.client_id)
-    scope = escape(txn.scope)
-    transaction_id_escaped = escape(transaction_id)
-
-    csrf_token = generate_csrf_token(request)
-    csrf_token_escaped = escape(csrf_token)
-
-
+    # The compiled template is cached by Jinja and autoescapes every value, so
+    # the request-specific fields are passed through as they are
     context = {
         "request": request,  # Required by FastAPI for TemplateResponse
-        "transaction_id": transaction_id_escaped,
-        "client_id": client_id,
-        "scope": scope,
-        "csrf_token": csrf_token_escaped,
-        "app_name": "Model Context Protocol (MCP) Host Application",
-        "upstream_provider": "Zoho Accounts"
+        "transaction_id": transaction_id,
+        "client_id": txn.client_id,
+        "scope": txn.scope,
+        "csrf_token": generate_csrf_token(request),
+        **_CONSENT_PAGE_CONSTANTS,
     }
 
     return templates.TemplateResponse(request=request, name="consent.html", context=context)
 
 @authRouter.post("/consent/approve", dependencies=[Depends(scenario_standard_rate_limit())])
-async def approve_consent(request: Request, transaction_id: str = Form(..., max_length=100),
+async def approve_consent(request: Request, transaction_id: str = Form(..., max_length=_MAX_TRANSACTION_ID_LENGTH),
                           csrf_token: str = Form(...)
                           ):
     """
@@ -686,35 +892,29 @@ async def approve_consent(request: Request, transaction_id: str = Form(..., max_
 
     validate_csrf_token(request, csrf_token)
 
-    logger.info(f"User approved consent for transaction_id: {transaction_id}")
-    txn: AuthorizationTransaction = auth_transactions_store.get(transaction_id)
+    logger.info("User approved consent for transaction_id: %s", transaction_id)
+    txn = _decode_transaction(transaction_id)
     if not txn:
-        logger.warning(f"Approval attempted for invalid transaction_id: {transaction_id}")
+        logger.warning("Approval attempted for invalid transaction_id: %s", transaction_id)
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid_transaction")
 
-    if txn.expires_at.replace(tzinfo=timezone.utc) < datetime.now(timezone.utc): 
-        logger.warning(f"Expired transaction in approval flow for transaction_id: {transaction_id}")
-        auth_transactions_store.delete(transaction_id)
+    if txn.expires_at < datetime.now(UTC):
+        logger.warning("Expired transaction in approval flow for transaction_id: %s", transaction_id)
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="transaction_expired")   
 
-    upstream_auth_endpoint = urljoin(
-        Settings.oidc_provider_base_url().rstrip('/') + '/', 
-        "oauth/v2/auth"
-    )
-
-    proxy_callback_uri = urljoin(Settings.MCP_SERVER_PUBLIC_URL.rstrip('/') + '/', "auth/callback")
+    urls = _urls()
     upstream_params = {
         "client_id": Settings.OIDC_PROVIDER_CLIENT_ID, 
         "response_type": "code",
-        "redirect_uri": proxy_callback_uri,
+        "redirect_uri": urls.proxy_callback,
         "scope": txn.scope,
         "state": transaction_id,
         "access_type": "offline",
         "prompt": "Consent"
     }
     
-    upstream_auth_url = build_url_with_params(upstream_auth_endpoint, upstream_params)
-    logger.info(f"Redirecting user to upstream authorization endpoint for transaction_id: {transaction_id}")
+    upstream_auth_url = build_url_with_params(_upstream().authorize, upstream_params)
+    logger.info("Redirecting user to upstream authorization endpoint for transaction_id: %s", transaction_id)
     return RedirectResponse(url=upstream_auth_url, status_code=status.HTTP_302_FOUND)
 
 
@@ -726,20 +926,10 @@ def build_error_redirect_url(base_url: str, params: Dict[str, str]) -> str:
     return urlunsplit((parsed.scheme, parsed.netloc, parsed.path, query, parsed.fragment))
 
 
-def ensure_aware_utc(dt: datetime) -> datetime:
-    """
-    Ensures a datetime object is timezone-aware (UTC) for comparison, 
-    assuming naive datetimes (common in older in-memory objects) were intended to be UTC.
-    """
-    if dt.tzinfo is None or dt.tzinfo.utcoffset(dt) is None:
-        return dt.replace(tzinfo=timezone.utc)
-    return dt
-
-
 @authRouter.get("/auth/callback", dependencies=[Depends(scenario_standard_rate_limit())])
 async def proxy_callback(
     code: str = Query(..., max_length=100), 
-    state: str = Query(..., max_length=100),
+    state: str = Query(..., max_length=_MAX_TRANSACTION_ID_LENGTH),
     location: str | None = Query(None, max_length=200)
 ):
     """
@@ -753,9 +943,9 @@ async def proxy_callback(
     provider and issues a new, distinct authorization code back to the dynamic MCP Client.
 
     Process:
-    1. Transaction Validation: The incoming `state` (which corresponds to the 
-       `transaction_id` stored earlier) is validated against the active in-memory 
-       transactions (`AUTH_TRANSACTIONS`) to prevent CSRF and replay attacks.
+    1. Transaction Validation: The incoming `state` (the signed `transaction_id`
+       issued by `/authorize`) has its signature and expiry verified to prevent
+       forged or stale transactions.
     2. Upstream Code Capture: The `code` (the upstream authorization code) and 
        any provider-specific parameters (`location`, `accounts_server`) are captured 
        and stored within the transaction state.
@@ -771,29 +961,29 @@ async def proxy_callback(
     MCP Client will use in the subsequent `/token` exchange, allowing the proxy 
     to retrieve the stored upstream code and complete the flow.
     """
-    logger.info(f"Received callback from upstream provider for transaction_id: {state}")
+    logger.info("Received callback from upstream provider for transaction_id: %s", state)
     transaction_id = state
-    txn: AuthorizationTransaction = auth_transactions_store.get(transaction_id)
-    
+    txn = _decode_transaction(transaction_id)
 
     if not txn:
-        logger.error(f"Callback received with invalid or expired transaction_id: {transaction_id}")
+        logger.error("Callback received with invalid or expired transaction_id: %s", transaction_id)
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid_state_or_transaction_expired")
 
-    if ensure_aware_utc(txn.expires_at) < datetime.now(timezone.utc):
-        logger.warning(f"Expired transaction in callback for transaction_id: {transaction_id}")
-        auth_transactions_store.delete(transaction_id)
+    # Decoded transactions are always UTC-aware, and one clock read serves the
+    # expiry check and the new code's timestamps
+    now = datetime.now(UTC)
+    if txn.expires_at < now:
+        logger.warning("Expired transaction in callback for transaction_id: %s", transaction_id)
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="transaction_expired")
         
 
-    logger.debug(f"Storing upstream authorization code for transaction_id: {transaction_id}")
+    logger.debug("Storing upstream authorization code for transaction_id: %s", transaction_id)
     
     new_auth_code = secrets.token_urlsafe(32)
-    now = datetime.now(timezone.utc)
     
 
-    auth_codes_store.set(
-        new_auth_code,
+    await auth_codes_store.set(
+        _auth_code_key(new_auth_code),
         AuthorizationCode(
             created_at=now,
             expires_at=now + timedelta(seconds=Settings.OAUTH_AUTH_CODE_TTL),
@@ -808,18 +998,21 @@ async def proxy_callback(
         ttl_in_sec=Settings.OAUTH_AUTH_CODE_TTL
     )
 
-    logger.info(f"Generated proxy authorization code for client_id: {txn.client_id}")
+    logger.info("Generated proxy authorization code for client_id: %s", txn.client_id)
 
     client_params = {
         "code": new_auth_code,
         "state": txn.state
     }
     
-    final_redirect_url = build_url_with_params(txn.redirect_uri.__str__(), client_params)
-    logger.debug(f"Redirecting to client callback URI for client_id: {txn.client_id}")
+    final_redirect_url = build_url_with_params(txn.redirect_uri, client_params)
+    logger.debug("Redirecting to client callback URI for client_id: %s", txn.client_id)
     return RedirectResponse(url=final_redirect_url, status_code=status.HTTP_302_FOUND)
 
 
+_TOKEN_RESPONSE_KEYS = ("access_token", "token_type", "expires_in", "refresh_token", "scope", "id_token")
+
+
 async def upstream_token_exchange(payload: dict) -> dict:
     """
     ## Upstream Token Exchange
@@ -832,8 +1025,8 @@ async def upstream_token_exchange(payload: dict) -> dict:
 authorization code (received during the `/auth/callback` step) for the 
     actual Access Token, Refresh Token, and ID Token from the upstream provider.
     """
-    token_endpoint = urljoin(Settings.oidc_provider_base_url().rstrip('/') + '/', "oauth/v2/token")
-    
+    token_endpoint = _upstream().token
+
     # Inject static proxy credentials for the upstream provider
     data = {
         **payload,
@@ -843,22 +1036,31 @@ authorization code (received during the `/auth/callback` step) for the
 
     # redirect_uri is only needed for the initial authorization_code exchange
     if payload.get("grant_type") == "authorization_code":
-        data["redirect_uri"] = urljoin(Settings.MCP_SERVER_PUBLIC_URL.rstrip('/') + '/', "auth/callback")
+        data["redirect_uri"] = _urls().proxy_callback
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                token_endpoint,
-                data=data,
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-                timeout=5.0
-            )
+        # Shared pool, so repeat exchanges skip the TCP and TLS handshakes
+        response = await _get_upstream_http().post(
+            token_endpoint,
+            data=data,
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            timeout=httpx.Timeout(5.0, connect=2.0),
+        )
         response.raise_for_status()
-        return response.json()
     except httpx.HTTPStatusError as e:
-        logger.error(f"Upstream error: {e.response.text}")
+        logger.error("Upstream error: %s", e.response.text)
         raise
 
+    upstream_tokens = orjson.loads(response.content)
+    # The upstream reports some failures (e.g. a spent code) as a 200 with an "error" body
+    if not isinstance(upstream_tokens, dict) or "access_token" not in upstream_tokens:
+        logger.error("Upstream token response without access_token: %s", response.text)
+        raise ValueError("upstream token response has no access_token")
+    # Only the RFC 6749 §5.1 fields are relayed; upstream extras and nulls are dropped
+    tokens = {k: v for k in _TOKEN_RESPONSE_KEYS if (v := upstream_tokens.get(k)) is not None}
+    tokens.setdefault("token_type", "Bearer")
+    return tokens
+
 
 @authRouter.post("/token", dependencies=[Depends(scenario_standard_rate_limit())])
 async def token_exchange(
@@ -885,12 +1087,15 @@ async def token_exchange(
     """
     
 
-    logger.info(f"Token exchange requested for client_id: {client_id}")
+    logger.info("Token exchange requested for client_id: %s", client_id)
 
-    client_data : DynamicClientRegistrationRequest = registed_clients_store.get(client_id)
-    if not client_data or client_data.secret != client_secret:
-        logger.warning(f"Invalid client credentials for client_id: {client_id}")
-        return JSONResponse(
+    client_data : DynamicClientRegistrationRequest = await registed_clients_store.get(client_id)
+    # Constant-time compare on bytes; compare_digest rejects non-ASCII str input
+    if not client_data or not client_data.secret or not hmac.compare_digest(
+        client_data.secret.encode(), client_secret.encode()
+    ):
+        logger.warning("Invalid client credentials for client_id: %s", client_id)
+        return ORJSONResponse(
             status_code=401,
             content={
                 "error": "invalid_client",
@@ -902,44 +1107,73 @@ async def token_exchange(
             }
         )
 
-    upstream_payload = {"grant_type": grant_type}
-
     if grant_type == "authorization_code":
         if not code:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="code_required")
             
-        auth_code_data: AuthorizationCode = auth_codes_store.get(code)
-        if not auth_code_data or auth_code_data.client_id != client_id:
-            logger.warning(f"Invalid or mismatched code for client: {client_id}")
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid_grant")
-
-        if ensure_aware_utc(auth_code_data.expires_at) < datetime.now(timezone.utc):
-            auth_codes_store.delete(code)
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid_grant")
-
-        
-        validate_pkce(code_verifier=code_verifier, code_challenge=auth_code_data.code_challenge, method=auth_code_data.code_challenge_method)
-        upstream_payload["code"] = auth_code_data.upstream_code
-        auth_codes_store.delete(code)
+        code_key = _auth_code_key(code)
+        if (recent := _recent_code_exchanges.get(code_key)) is not None:
+            recent_client_id, verifier_digest, recent_exchange = recent
+            # Only the client holding the PKCE verifier may see the tokens again
+            if recent_client_id != client_id or not code_verifier or not hmac.compare_digest(
+                verifier_digest, hashlib.sha256(code_verifier.encode()).digest()
+            ):
+                logger.warning("Replayed code rejected for client: %s", client_id)
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid_grant")
+            exchange = asyncio.shield(recent_exchange)
+        else:
+            exchange = await _redeem_authorization_code(code_key, client_id, redirect_uri, code_verifier)
 
     elif grant_type == "refresh_token":
         if not refresh_token:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="refresh_token_required")
-        
-        upstream_payload["refresh_token"] = refresh_token
+
+        exchange = upstream_token_exchange({"grant_type": grant_type, "refresh_token": refresh_token})
 
     else:
-        logger.warning(f"Unsupported grant type: {grant_type}")
+        logger.warning("Unsupported grant type: %s", grant_type)
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="unsupported_grant_type")
 
 
     try:
-        upstream_tokens = await upstream_token_exchange(upstream_payload)
-        return JSONResponse(content=upstream_tokens, status_code=status.HTTP_200_OK)
-    except Exception:
-        logger.error(f"Upstream exchange failed for {grant_type}", exc_info=True)
+        upstream_tokens = await exchange
+        return ORJSONResponse(content=upstream_tokens, status_code=status.HTTP_200_OK)
+    # Transport failures, non-2xx replies and unparseable bodies; anything else is a bug
+    except (httpx.HTTPError, ValueError):
+        logger.error("Upstream exchange failed for %s", grant_type, exc_info=True)
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="upstream_token_exchange_failed")
-    
+
+
+async def _redeem_authorization_code(
+    code_key: str, client_id: str, redirect_uri: Optional[str], code_verifier: Optional[str]
+) -> asyncio.Future:
+    """Consume and validate an authorization code, then start its upstream exchange."""
+    # Consumed before any check so concurrent requests with the same code cannot
+    # both redeem it; a code that fails validation is spent as well (RFC 6749 §4.1.2)
+    auth_code_data: AuthorizationCode = await auth_codes_store.pop(code_key)
+    if not auth_code_data or auth_code_data.client_id != client_id:
+        logger.warning("Invalid or mismatched code for client: %s", client_id)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid_grant")
+
+    # RFC 6749 §4.1.3; stored as a plain str, so this is a direct string compare
+    if redirect_uri is not None and auth_code_data.redirect_uri != redirect_uri:
+        logger.warning("Mismatched redirect_uri for client: %s", client_id)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid_grant")
+
+    # The store TTL already drops expired codes, except on Catalyst, which rounds it up to whole hours.
+    # expires_at is always UTC-aware (set from datetime.now(UTC) at issuance), so its
+    # timestamp() compares directly against the epoch clock.
+    if auth_code_data.expires_at.timestamp() < time.time():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid_grant")
+
+    validate_pkce(code_verifier=code_verifier, code_challenge=auth_code_data.code_challenge, method=auth_code_data.code_challenge_method)
+
+    task = asyncio.create_task(
+        upstream_token_exchange({"grant_type": "authorization_code", "code": auth_code_data.upstream_code})
+    )
+    _recent_code_exchanges[code_key] = (client_id, hashlib.sha256(code_verifier.encode()).digest(), task)
+    # Shielded so a client disconnecting mid-exchange does not cancel it for a retry
+    return asyncio.shield(task)
 
 
 _PKCE_VERIFIER_RE = re.compile(r"^[A-Za-z0-9\-._~]{43,128}$")
@@ -1,30 +1,69 @@
+import hashlib
+import hmac
 import os
 import re
+import threading
+from functools import lru_cache
+from cachetools import TTLCache
 from typing import Literal
 from src.sdk.analytics_client import AnalyticsClient
 from dotenv import load_dotenv
 from fastmcp.server.dependencies import get_http_request
 from starlette.requests import Request
+from fastapi import HTTPException, status
 from urllib.parse import urlparse
 from ipaddress import ip_address, ip_network, IPv4Network, IPv6Network
 
 load_dotenv()
 
 
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting; unset and empty variables fall back to the default."""
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Read a boolean setting; only a case-insensitive "true" enables it."""
+    value = os.getenv(name)
+    return value.lower() == "true" if value else default
+
+
+# Region suffix following ".zoho." in a domain -> accounts server for that region
+_REGIONAL_ACCOUNTS_URLS = {
+    "in": "https://accounts.zoho.in",
+    "eu": "https://accounts.zoho.eu",
+    "com.au": "https://accounts.zoho.com.au",
+    "jp": "https://accounts.zoho.jp",
+}
+
+
+@lru_cache(maxsize=None)
+def _accounts_url_for_server(analytics_server_url: str) -> str:
+    """Accounts server URL for an analytics server URL; resolved once per distinct URL."""
+    return Settings._get_accounts_url(urlparse(analytics_server_url).netloc)
+
+
+@lru_cache(maxsize=8)
+def _parse_org_ids(raw_org_ids: str) -> frozenset[str]:
+    """Parsed once per distinct MCP_SERVER_ORG_IDS value."""
+    if not raw_org_ids:
+        return frozenset()
+    return frozenset(org_id.strip() for org_id in raw_org_ids.split(",") if org_id.strip())
+
+
+# Published in the docs, so anything signed with it (or a key derived from it) is forgeable
+_DEFAULT_SESSION_SECRET_KEY = "supersecretkey"
+
+
 class Settings:
 
     @staticmethod
     def _get_accounts_url(project_domain: str) -> str:
-        region_map = {
-            ".zoho.in": "https://accounts.zoho.in",
-            ".zoho.eu": "https://accounts.zoho.eu",
-            ".zoho.com.au": "https://accounts.zoho.com.au",
-            ".zoho.jp": "https://accounts.zoho.jp",
-        }
-        for suffix, url in region_map.items():
-            if project_domain.endswith(suffix):
-                return url
-        return "https://accounts.zoho.com"
+        """Accounts server for a domain or URL such as "api.catalyst.zoho.eu"."""
+        host = (urlparse(project_domain).hostname or "") if "://" in project_domain else project_domain
+        _, _, region = host.rpartition(".zoho.")
+        return _REGIONAL_ACCOUNTS_URLS.get(region, "https://accounts.zoho.com")
 
     @classmethod
     def _analytics_domain(cls) -> str:
@@ -32,24 +71,29 @@ class Settings:
 
     @classmethod
     def accounts_server_url(cls) -> str:
-        return cls._get_accounts_url(cls._analytics_domain())
+        return _accounts_url_for_server(cls.ANALYTICS_SERVER_URL)
 
 
     @classmethod
     def oidc_provider_base_url(cls) -> str:
         return cls.accounts_server_url()
 
+    @classmethod
+    def uses_default_secret_key(cls) -> bool:
+        """True while session cookies or OAuth transactions are signed with the published default."""
+        return _DEFAULT_SESSION_SECRET_KEY in (cls.SESSION_SECRET_KEY, cls.OAUTH_TRANSACTION_SIGNING_KEY)
+
 
     # General Settings
     ANALYTICS_SERVER_URL = os.getenv("ANALYTICS_SERVER_URL", "https://analyticsapi.zoho.com")
 
     ## Tools
-    ANALYTICS_WORKSPACE_LIST_RESULT_SIZE = int(os.getenv("ANALYTICS_WORKSPACE_LIST_RESULT_SIZE") or 20)
-    ANALYTICS_VIEW_LIST_RESULT_SIZE = int(os.getenv("ANALYTICS_VIEW_LIST_RESULT_SIZE") or 15)
-    QUERY_DATA_RESULT_ROW_LIMITS = int(os.getenv("QUERY_DATA_RESULT_ROW_LIMITS") or 20)
-    QUERY_DATA_POLLING_INTERVAL = int(os.getenv("QUERY_DATA_POLLING_INTERVAL") or 4)
-    QUERY_DATA_QUEUE_TIMEOUT = int(os.getenv("QUERY_DATA_QUEUE_TIMEOUT") or 120)
-    QUERY_DATA_QUERY_EXECUTION_TIMEOUT = int(os.getenv("QUERY_DATA_QUERY_EXECUTION_TIMEOUT") or 30)
+    ANALYTICS_WORKSPACE_LIST_RESULT_SIZE = _env_int("ANALYTICS_WORKSPACE_LIST_RESULT_SIZE", 20)
+    ANALYTICS_VIEW_LIST_RESULT_SIZE = _env_int("ANALYTICS_VIEW_LIST_RESULT_SIZE", 15)
+    QUERY_DATA_RESULT_ROW_LIMITS = _env_int("QUERY_DATA_RESULT_ROW_LIMITS", 20)
+    QUERY_DATA_POLLING_INTERVAL = _env_int("QUERY_DATA_POLLING_INTERVAL", 4)
+    QUERY_DATA_QUEUE_TIMEOUT = _env_int("QUERY_DATA_QUEUE_TIMEOUT", 120)
+    QUERY_DATA_QUERY_EXECUTION_TIMEOUT = _env_int("QUERY_DATA_QUERY_EXECUTION_TIMEOUT", 30)
 
     # Settings required for Local
     CLIENT_ID = os.getenv("ANALYTICS_CLIENT_ID")
@@ -63,10 +107,11 @@ class Settings:
     OIDC_PROVIDER_CLIENT_SECRET = os.getenv("OIDC_PROVIDER_CLIENT_SECRET")
     MCP_SERVER_PUBLIC_URL = os.getenv("MCP_SERVER_PUBLIC_URL")
     HOSTED_LOCATION = None # "LOCAL" or "REMOTE", set in startup
-    SESSION_SECRET_KEY = os.getenv("SESSION_SECRET_KEY", "supersecretkey")
-    PORT = int(os.getenv("PORT","4000"))
+    SESSION_SECRET_KEY = os.getenv("SESSION_SECRET_KEY", _DEFAULT_SESSION_SECRET_KEY)
+    PORT = _env_int("PORT", 4000)
+    ENABLE_DEBUGPY = _env_bool("ENABLE_DEBUGPY", False)
     MCP_SERVER_ORG_IDS = os.getenv("MCP_SERVER_ORG_IDS", "")
-    BEHIND_PROXY = os.getenv("BEHIND_PROXY", "False").lower() == "true"
+    BEHIND_PROXY = _env_bool("BEHIND_PROXY", False)
     TRUSTED_PROXY_LIST: list[IPv4Network | IPv6Network] = (
         [ip_network(ip.strip(), strict=False) 
          for ip in os.getenv("TRUSTED_PROXY_LIST", "").split(",") if ip.strip()]
@@ -110,8 +155,11 @@ class Settings:
     ## Persistence Settings for Remote
     STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "memory").lower()
     REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
-    REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+    REDIS_PORT = _env_int("REDIS_PORT", 6379)
     REDIS_PASSWORD = os.getenv("REDIS_PASSWORD")  
+    REDIS_POOL_SIZE = _env_int("REDIS_POOL_SIZE", 100)
+    REDIS_POOL_TIMEOUT = _env_int("REDIS_POOL_TIMEOUT", 5)
+    REDIS_LOCAL_CACHE_TTL = _env_int("REDIS_LOCAL_CACHE_TTL", 30)
 
     # Catalyst Persistence Settings
     CATALYST_SDK_APP_NAME = os.getenv("CATALYST_SDK_APP_NAME", "ZohoAnalyticsRemoteMCPServer")
@@ -123,6 +171,7 @@ class Settings:
     CATALYST_REFRESH_TOKEN = os.getenv("CATALYST_REFRESH_TOKEN")
     CATALYST_CACHE_SEGMENT_ID = os.getenv("CATALYST_CACHE_SEGMENT_ID")
     CATALYST_PROJECT_DOMAIN = os.getenv("CATALYST_PROJECT_DOMAIN", "https://api.catalyst.zoho.in")
+    CATALYST_LOCAL_CACHE_TTL = _env_int("CATALYST_LOCAL_CACHE_TTL", 30)
 
 
     CONSTANT_REMOTE_HOSTED_LOCATION = "REMOTE"
@@ -131,32 +180,40 @@ class Settings:
 
     OAUTH_DEFAULT_SCOPE = os.getenv("OAUTH_DEFAULT_SCOPE", "ZohoAnalytics.fullaccess.all")
     OAUTH_OFFLINE_ACCESS_SCOPE = os.getenv("OAUTH_OFFLINE_ACCESS_SCOPE", "offline_access")
-    OAUTH_MAX_CLIENT_NAME_LENGTH = int(os.getenv("OAUTH_MAX_CLIENT_NAME_LENGTH", "80"))
-    OAUTH_MAX_STRING_LENGTH = int(os.getenv("OAUTH_MAX_STRING_LENGTH", "256"))
-    OAUTH_MAX_SCOPE_LENGTH = int(os.getenv("OAUTH_MAX_SCOPE_LENGTH", "100"))
-    OAUTH_MAX_REDIRECT_URIS = int(os.getenv("OAUTH_MAX_REDIRECT_URIS", "5"))
-    OAUTH_MAX_GRANT_TYPES = int(os.getenv("OAUTH_MAX_GRANT_TYPES", "2"))
-    OAUTH_MAX_RESPONSE_TYPES = int(os.getenv("OAUTH_MAX_RESPONSE_TYPES", "1"))
-    OAUTH_AUTH_TRANSACTION_TTL = int(os.getenv("OAUTH_AUTH_TRANSACTION_TTL", "120"))
-    OAUTH_AUTH_CODE_TTL = int(os.getenv("OAUTH_AUTH_CODE_TTL", "120"))
-    OAUTH_REGISTERED_CLIENTS_TTL = int(os.getenv("OAUTH_REGISTERED_CLIENTS_TTL", "36000"))
-    OAUTH_CLIENT_IP_MAPPING_TTL = int(os.getenv("OAUTH_CLIENT_IP_MAPPING_TTL", "18000"))
-
-    GLOBAL_OAUTH_RATE_LIMIT_CAPACITY = int(os.getenv("GLOBAL_OAUTH_RATE_LIMIT_CAPACITY", "30"))
-    GLOBAL_OAUTH_RATE_LIMIT_WINDOW = int(os.getenv("GLOBAL_OAUTH_RATE_LIMIT_WINDOW", "60"))
-
-    PRIVATE_OAUTH_STANDARD_RATE_LIMIT_COUNT = int(os.getenv("PRIVATE_OAUTH_STANDARD_RATE_LIMIT_COUNT", "5"))
-    PRIVATE_OAUTH_STANDARD_RATE_LIMIT_WINDOW = int(os.getenv("PRIVATE_OAUTH_STANDARD_RATE_LIMIT_WINDOW", "60"))
-    PUBLIC_OAUTH_STANDARD_RATE_LIMIT_COUNT = int(os.getenv("PUBLIC_OAUTH_STANDARD_RATE_LIMIT_COUNT", "100"))
-    PUBLIC_OAUTH_STANDARD_RATE_LIMIT_WINDOW = int(os.getenv("PUBLIC_OAUTH_STANDARD_RATE_LIMIT_WINDOW", "60"))
-
-    PRIVATE_OAUTH_REGISTRATION_RATE_LIMIT_COUNT = int(os.getenv("PRIVATE_OAUTH_REGISTRATION_RATE_LIMIT_COUNT", "10"))
-    PRIVATE_OAUTH_REGISTRATION_RATE_LIMIT_WINDOW = int(os.getenv("PRIVATE_OAUTH_REGISTRATION_RATE_LIMIT_WINDOW", "3600"))
-    PUBLIC_OAUTH_REGISTRATION_RATE_LIMIT_COUNT = int(os.getenv("PUBLIC_OAUTH_REGISTRATION_RATE_LIMIT_COUNT", "50"))
-    PUBLIC_OAUTH_REGISTRATION_RATE_LIMIT_WINDOW = int(os.getenv("PUBLIC_OAUTH_REGISTRATION_RATE_LIMIT_WINDOW", "3600"))
-
-    PRIVATE_OAUTH_MAX_CLIENTS_PER_IP = int(os.getenv("PRIVATE_OAUTH_MAX_CLIENTS_PER_IP", "5"))
-    PUBLIC_OAUTH_MAX_CLIENTS_PER_IP = int(os.getenv("PUBLIC_OAUTH_MAX_CLIENTS_PER_IP", "0"))
+    OAUTH_MAX_CLIENT_NAME_LENGTH = _env_int("OAUTH_MAX_CLIENT_NAME_LENGTH", 80)
+    OAUTH_MAX_STRING_LENGTH = _env_int("OAUTH_MAX_STRING_LENGTH", 256)
+    OAUTH_MAX_SCOPE_LENGTH = _env_int("OAUTH_MAX_SCOPE_LENGTH", 100)
+    OAUTH_MAX_REDIRECT_URIS = _env_int("OAUTH_MAX_REDIRECT_URIS", 5)
+    OAUTH_MAX_GRANT_TYPES = _env_int("OAUTH_MAX_GRANT_TYPES", 2)
+    OAUTH_MAX_RESPONSE_TYPES = _env_int("OAUTH_MAX_RESPONSE_TYPES", 1)
+    OAUTH_AUTH_TRANSACTION_TTL = _env_int("OAUTH_AUTH_TRANSACTION_TTL", 120)
+    # Signs the stateless authorization transactions; must match across replicas. When
+    # unset it is derived from SESSION_SECRET_KEY, so session cookies and transactions
+    # are never signed with the same key.
+    OAUTH_TRANSACTION_SIGNING_KEY = os.getenv("OAUTH_TRANSACTION_SIGNING_KEY") or hmac.new(
+        SESSION_SECRET_KEY.encode(), b"oauth-transaction", hashlib.sha256
+    ).hexdigest()
+    OAUTH_AUTH_CODE_TTL = _env_int("OAUTH_AUTH_CODE_TTL", 120)
+    OAUTH_REGISTERED_CLIENTS_TTL = _env_int("OAUTH_REGISTERED_CLIENTS_TTL", 36000)
+    OAUTH_CLIENT_IP_MAPPING_TTL = _env_int("OAUTH_CLIENT_IP_MAPPING_TTL", 18000)
+    OAUTH_TOKEN_VALIDATION_CACHE_TTL = _env_int("OAUTH_TOKEN_VALIDATION_CACHE_TTL", 300)
+    OAUTH_CODE_EXCHANGE_REPLAY_TTL = _env_int("OAUTH_CODE_EXCHANGE_REPLAY_TTL", 15)
+
+    GLOBAL_OAUTH_RATE_LIMIT_CAPACITY = _env_int("GLOBAL_OAUTH_RATE_LIMIT_CAPACITY", 30)
+    GLOBAL_OAUTH_RATE_LIMIT_WINDOW = _env_int("GLOBAL_OAUTH_RATE_LIMIT_WINDOW", 60)
+
+    PRIVATE_OAUTH_STANDARD_RATE_LIMIT_COUNT = _env_int("PRIVATE_OAUTH_STANDARD_RATE_LIMIT_COUNT", 5)
+    PRIVATE_OAUTH_STANDARD_RATE_LIMIT_WINDOW = _env_int("PRIVATE_OAUTH_STANDARD_RATE_LIMIT_WINDOW", 60)
+    PUBLIC_OAUTH_STANDARD_RATE_LIMIT_COUNT = _env_int("PUBLIC_OAUTH_STANDARD_RATE_LIMIT_COUNT", 100)
+    PUBLIC_OAUTH_STANDARD_RATE_LIMIT_WINDOW = _env_int("PUBLIC_OAUTH_STANDARD_RATE_LIMIT_WINDOW", 60)
+
+    PRIVATE_OAUTH_REGISTRATION_RATE_LIMIT_COUNT = _env_int("PRIVATE_OAUTH_REGISTRATION_RATE_LIMIT_COUNT", 10)
+    PRIVATE_OAUTH_REGISTRATION_RATE_LIMIT_WINDOW = _env_int("PRIVATE_OAUTH_REGISTRATION_RATE_LIMIT_WINDOW", 3600)
+    PUBLIC_OAUTH_REGISTRATION_RATE_LIMIT_COUNT = _env_int("PUBLIC_OAUTH_REGISTRATION_RATE_LIMIT_COUNT", 50)
+    PUBLIC_OAUTH_REGISTRATION_RATE_LIMIT_WINDOW = _env_int("PUBLIC_OAUTH_REGISTRATION_RATE_LIMIT_WINDOW", 3600)
+
+    PRIVATE_OAUTH_MAX_CLIENTS_PER_IP = _env_int("PRIVATE_OAUTH_MAX_CLIENTS_PER_IP", 5)
+    PUBLIC_OAUTH_MAX_CLIENTS_PER_IP = _env_int("PUBLIC_OAUTH_MAX_CLIENTS_PER_IP", 0)
 
     @classmethod
     def _is_public(cls) -> bool:
@@ -203,11 +260,9 @@ class Settings:
 
 
     @staticmethod
-    def get_allowed_org_ids():
-        """Parse comma-separated org IDs into a list, filtering out empty values."""
-        if not Settings.MCP_SERVER_ORG_IDS:
-            return []
-        return [org_id.strip() for org_id in Settings.MCP_SERVER_ORG_IDS.split(",") if org_id.strip()]
+    def get_allowed_org_ids() -> frozenset[str]:
+        """Comma-separated MCP_SERVER_ORG_IDS as a set, filtering out empty values."""
+        return _parse_org_ids(Settings.MCP_SERVER_ORG_IDS)
 
 
 # Scenario-aware derived values kept for backward compatibility with existing imports
@@ -216,38 +271,77 @@ class Settings:
 # Settings.OAUTH_MAX_CLIENTS_PER_IP = Settings.get_max_clients_per_ip()
 
 
+# RFC 6750 b64token characters. translate() deletes these, so a well-formed
+# token translates to b"" in a single C-level pass.
+_TOKEN_CHARS = (
+    b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~+/="
+)
+
+
+def is_well_formed_bearer_token(token: str) -> bool:
+    """RFC 6750 b64token check, shared by AuthMiddleware and get_access_token."""
+    return bool(token) and token.isascii() and not token.encode("ascii").translate(None, _TOKEN_CHARS)
+
+
 def get_access_token():
     """
     For getting the access token from the MCP server.
     """
     request: Request = get_http_request()
-    auth_header = request.headers.get("Authorization")
-    access_token = auth_header.split(" ")[1]
+    auth_header = request.headers.get("Authorization") or ""
+    scheme, _, access_token = auth_header.partition(" ")
+    if scheme.lower() != "bearer" or not is_well_formed_bearer_token(access_token):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Missing or malformed Bearer Authorization header",
+        )
     return access_token
 
+_REMOTE_CLIENT_CACHE_TTL_SECONDS = 3000
+_remote_clients: TTLCache = TTLCache(maxsize=1024, ttl=_REMOTE_CLIENT_CACHE_TTL_SECONDS)
+_client_lock = threading.Lock()
+
+
+def _remote_analytics_client(access_token: str) -> AnalyticsClient:
+    """
+    Per-token AnalyticsClient for REMOTE mode. Reusing the client across calls made
+    with the same token keeps its HTTP connection pool warm. Entries are keyed by a
+    digest of the token and expire before a typical access token would.
+    """
+    key = hashlib.sha256(access_token.encode()).digest()
+    with _client_lock:
+        client = _remote_clients.get(key)
+        if client is None:
+            client = AnalyticsClient.from_access_token(access_token)
+            client.accounts_server_url = Settings.accounts_server_url()
+            client.analytics_server_url = Settings.ANALYTICS_SERVER_URL
+            _remote_clients[key] = client
+    return client
+
+
 analytics_client: AnalyticsClient  = None
 def get_analytics_client_instance(access_token = None) -> AnalyticsClient:
     """
     Returns a singleton instance of the AnalyticsClient.
-    If access_token is provided, returns a new AnalyticsClient instance using that token.
+    In REMOTE mode, returns the (cached) AnalyticsClient bound to the request's access token.
     Otherwise, returns (or creates) the singleton client using credentials from Settings.
     """
 
     if Settings.HOSTED_LOCATION == Settings.CONSTANT_REMOTE_HOSTED_LOCATION:
         if access_token is None:
             access_token = get_access_token()
-        client = AnalyticsClient.from_access_token(access_token)
-        client.accounts_server_url = Settings.accounts_server_url()
-        client.analytics_server_url = Settings.ANALYTICS_SERVER_URL
-        return client
+        return _remote_analytics_client(access_token)
 
 
     global analytics_client
-    if not analytics_client:
-        analytics_client = AnalyticsClient.from_refresh_token(Settings.CLIENT_ID,  Settings.CLIENT_SECRET,  Settings.REFRESH_TOKEN)
-        if Settings.accounts_server_url() is None or Settings.ANALYTICS_SERVER_URL is None:
-            raise RuntimeError("ACCOUNTS_SERVER_URL (or) ANALYTICS_SERVER_URL environment variable is not set. Please set it to your Zoho Analytics accounts server URL and analytics server URL respectively.")
-        analytics_client.accounts_server_url = Settings.accounts_server_url()
-        analytics_client.analytics_server_url = Settings.ANALYTICS_SERVER_URL
+    if analytics_client is None:
+        with _client_lock:
+            if analytics_client is None:
+                if Settings.accounts_server_url() is None or Settings.ANALYTICS_SERVER_URL is None:
+                    raise RuntimeError("ACCOUNTS_SERVER_URL (or) ANALYTICS_SERVER_URL environment variable is not set. Please set it to your Zoho Analytics accounts server URL and analytics server URL respectively.")
+                client = AnalyticsClient.from_refresh_token(Settings.CLIENT_ID,  Settings.CLIENT_SECRET,  Settings.REFRESH_TOKEN)
+                client.accounts_server_url = Settings.accounts_server_url()
+                client.analytics_server_url = Settings.ANALYTICS_SERVER_URL
+                # Publish only the fully configured client
+                analytics_client = client
     return analytics_client
-    
\ No newline at end of file
@@ -1,67 +1,63 @@
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 import src.tools # Do not remove this import, it is required to register the tools with the MCP server.
 from src.mcp_instance import mcp
 from fastapi import FastAPI, Request
 import uvicorn
-import debugpy
 from src.auth.remote_auth import authRouter
 from src.logging_util import configure_logging, get_logger
-from src.auth.remote_auth import AuthMiddleware
+from src.auth.remote_auth import AuthMiddleware, open_upstream_http, close_upstream_http
 from src.config import Settings
 from starlette.middleware.sessions import SessionMiddleware
 # from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import asyncio
+import os
 from contextlib import asynccontextmanager
-from src.auth.persistence import InMemoryProvider, ttl_cleanup_task
-from src.auth.remote_auth import registed_clients_store, auth_transactions_store, auth_codes_store, client_ip_vs_client_ids_store
-from src.auth.rate_limiter import build_rate_limiter, _rate_limiter_cache, rate_limiter_cleanup_task, InMemoryTokenBucketRateLimiter
+from src.auth.persistence import RedisWriteBatchMiddleware, CatalystWriteFlushMiddleware, close_catalyst_providers
+from src.auth.rate_limiter import build_rate_limiter, build_registered_rate_limiters, _rate_limiter_cache, rate_limiter_cleanup_task, InMemoryTokenBucketRateLimiter
 from src.utils.security import MaxBodySizeMiddleware
 from fastapi.exceptions import RequestValidationError
 from src.utils.exceptions import validation_exception_handler
 
 Settings.HOSTED_LOCATION = Settings.CONSTANT_REMOTE_HOSTED_LOCATION
 
-configure_logging(
-    level="INFO",              # overall minimum
-    console_level="INFO",       # console: only INFO+
-    file_level="INFO",         # file: capture everything
-    log_file="app.log",
-    max_bytes=5 * 1024 * 1024,  # 5 MB
-    backup_count=3,
-    library_levels={
-        "docket": "WARNING",
-        "mcp": "WARNING",
-        "httpx": "WARNING",
-    },
-)
-
 logger = get_logger(__name__)
-# Uncomment below line to start the debugger
-# debugpy.listen(("0.0.0.0", 5678))
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
 
     background_tasks = []
 
-    stores = [registed_clients_store, auth_transactions_store, auth_codes_store, client_ip_vs_client_ids_store]
-    if any(isinstance(s, InMemoryProvider) for s in stores):
-        for store in stores:
-            background_tasks.append(asyncio.create_task(ttl_cleanup_task(store)))
-        logger.info("Background TTL schedulers started for InMemoryProviders.")
+    open_upstream_http()
+
+    if Settings.uses_default_secret_key():
+        logger.error(
+            "SESSION_SECRET_KEY is the documented default; session cookies and OAuth "
+            "transactions can be forged. Set SESSION_SECRET_KEY to a random secret."
+        )
+
+    # uvicorn reads WEB_CONCURRENCY as its default --workers
+    if Settings.STORAGE_BACKEND == "memory" and int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+        logger.warning(
+            "STORAGE_BACKEND=memory with multiple workers: authorization codes and registered "
+            "clients are per-process, so logins fail when /token reaches another worker. Use redis."
+        )
 
     app.state.global_rate_limiter = await build_rate_limiter(capacity=Settings.GLOBAL_OAUTH_RATE_LIMIT_CAPACITY, window_seconds=Settings.GLOBAL_OAUTH_RATE_LIMIT_WINDOW)
+    await build_registered_rate_limiters()
     
     for limiter in _rate_limiter_cache.values():
         if isinstance(limiter, InMemoryTokenBucketRateLimiter):
             background_tasks.append(asyncio.create_task(rate_limiter_cleanup_task(limiter)))
     
     if background_tasks:
-        logger.info(f"Started {len(background_tasks)} total background cleanup task(s).")
+        logger.info("Started %d total background cleanup task(s).", len(background_tasks))
 
     async with mcp_server.lifespan(app):
         yield
+
+    await close_catalyst_providers()
+    await close_upstream_http()
     
     for task in background_tasks:
         task.cancel()
@@ -70,20 +66,24 @@ async def lifespan(app: FastAPI):
         except asyncio.CancelledError:
             pass
     
-    logger.info(f"Successfully stopped {len(background_tasks)} background task(s).")
+    logger.info("Successfully stopped %d background task(s).", len(background_tasks))
 
 
 
 mcp_server = mcp.http_app(transport="streamable-http", path="/")
 
 def create_app() -> FastAPI:
-    app = FastAPI(lifespan=lifespan)
+    app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
     app.mount("/static", StaticFiles(directory="src/static"), name="static")
     app.add_middleware(
         MaxBodySizeMiddleware,
         max_body_size=1 * 1024 * 1024,  # 1 MB
     )
     app.add_middleware(AuthMiddleware)
+    if Settings.STORAGE_BACKEND == "redis":
+        app.add_middleware(RedisWriteBatchMiddleware)
+    elif Settings.STORAGE_BACKEND == "catalyst":
+        app.add_middleware(CatalystWriteFlushMiddleware)
 
 
     app.add_exception_handler(RequestValidationError, validation_exception_handler)
@@ -108,6 +108,22 @@ app = create_app()
 
 
 def main():
+    configure_logging(
+        level="INFO",              # overall minimum
+        console_level="INFO",       # console: only INFO+
+        file_level="INFO",         # file: capture everything
+        log_file="app.log",
+        max_bytes=5 * 1024 * 1024,  # 5 MB
+        backup_count=3,
+        library_levels={
+            "docket": "WARNING",
+            "mcp": "WARNING",
+            "httpx": "WARNING",
+        },
+    )
+    if Settings.ENABLE_DEBUGPY:
+        import debugpy
+        debugpy.listen(("0.0.0.0", 5678))
     port = Settings.PORT
     uvicorn.run(app, host="0.0.0.0", port=port)
 
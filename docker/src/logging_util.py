@@ -16,26 +16,34 @@ Usage:
     logger.info("Hello from my module")
 """
 
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from typing import Optional, Union
 
 
-_LEVEL_MAP = {
-    "CRITICAL": logging.CRITICAL,
-    "ERROR": logging.ERROR,
-    "WARNING": logging.WARNING,
-    "INFO": logging.INFO,
-    "DEBUG": logging.DEBUG,
-}
+# Snapshot of the standard level names (also accepts aliases such as WARN)
+_LEVEL_MAP = logging.getLevelNamesMapping()
+
+# Background thread that writes records queued by the root logger's QueueHandler
+_listener: Optional[QueueListener] = None
+# Arguments of the configure_logging call that started _listener
+_configured_with: Optional[tuple] = None
 
 
 def _to_level(level: Union[int, str]) -> int:
     """Convert string/int level to a logging level int."""
     if isinstance(level, int):
         return level
-    level = level.upper()
-    return _LEVEL_MAP.get(level, logging.INFO)
+    return _LEVEL_MAP.get(level.upper(), logging.INFO)
+
+
+@lru_cache(maxsize=8)
+def _formatter(fmt: str, datefmt: str) -> logging.Formatter:
+    """Shared Formatter per (fmt, datefmt); formatters hold no per-handler state."""
+    return logging.Formatter(fmt=fmt, datefmt=datefmt)
 
 
 def configure_logging(
@@ -77,13 +85,26 @@ def configure_logging(
     clear_existing:
         If True (default), removes existing handlers from the root logger
         before adding new ones. This avoids duplicate logs when `configure_logging`
-        is called multiple times.
+        is called multiple times. A repeat call with identical arguments is a
+        no-op, so the log file is not closed and reopened.
     library_levels:
         Optional dict mapping library logger names to their desired level.
         Use this to silence noisy third-party libraries while keeping your
         application logs at the configured level.
         Example: {"httpx": "WARNING", "mcp": "WARNING", "docket": "WARNING"}
+
+    The console and file handlers run on a QueueListener thread; the root logger
+    only gets a QueueHandler, so logging calls never block on stream or disk I/O.
     """
+    global _listener, _configured_with
+    config = (
+        level, console_level, file_level, log_file, max_bytes, backup_count,
+        fmt, datefmt, clear_existing,
+        tuple(sorted(library_levels.items())) if library_levels else None,
+    )
+    if _listener is not None and config == _configured_with:
+        return
+
     root = logging.getLogger()
 
     root_level = _to_level(level)
@@ -92,14 +113,17 @@ def configure_logging(
     if clear_existing:
         for h in list(root.handlers):
             root.removeHandler(h)
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
 
-    formatter = logging.Formatter(fmt=fmt, datefmt=datefmt)
+    formatter = _formatter(fmt, datefmt)
 
     # --- Console handler ---
     console_handler = logging.StreamHandler()
     console_handler.setLevel(_to_level(console_level or level))
     console_handler.setFormatter(formatter)
-    root.addHandler(console_handler)
+    handlers: list[logging.Handler] = [console_handler]
 
     # --- Optional rotating file handler ---
     if log_file:
@@ -111,7 +135,14 @@ def configure_logging(
         )
         file_handler.setLevel(_to_level(file_level or level))
         file_handler.setFormatter(formatter)
-        root.addHandler(file_handler)
+        handlers.append(file_handler)
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    root.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listener = listener
+    _configured_with = config
 
     # --- Per-library level overrides ---
     if library_levels:
@@ -119,6 +150,18 @@ def configure_logging(
             logging.getLogger(lib_name).setLevel(_to_level(lib_level))
 
 
+def _stop_listener() -> None:
+    global _listener, _configured_with
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        _configured_with = None
+
+
+# Flush whatever is still queued when the interpreter exits
+atexit.register(_stop_listener)
+
+
 def get_logger(name: Optional[str] = None) -> logging.Logger:
     """
     Get a logger for a module or component.
@@ -74,6 +74,7 @@ class AnalyticsClient:
         self.analytics_server_url = "https://analyticsapi.zoho.com"
 
         self.auth = auth
+        self._session: Optional[requests.Session] = None
 
         # self.client_id = client_id
         # self.client_secret = client_secret
@@ -2414,6 +2415,8 @@ class AnalyticsClient:
         self.proxy_port = proxy_port
         self.proxy_user_name = proxy_user_name
         self.proxy_password = proxy_password
+        # Rebuild the shared session with the new proxy settings on next use
+        self._session = None
 
     def send_batch_import_api_request(self, request_url, config, request_headers, file_path, batch_size, tool_config):
         if not self.auth.is_remote and self.auth.get_access_token() is None:
@@ -2509,16 +2512,7 @@ class AnalyticsClient:
 
             request_headers["User-Agent"] = "zoho-analytics-mcp-server"
             
-            req_obj = req_obj = requests.Session()
-            if self.proxy:
-                proxy_details = {
-                    "http" : "http://" + self.proxy_host + ":" + self.proxy_port,
-                    "https": "http://" + self.proxy_host + ":" + self.proxy_port
-                }
-                req_obj.proxies = proxy_details
-                if self.proxy_user_name != None and self.proxy_password != None:
-                    proxy_auth_details = HTTPProxyDigestAuth(self.proxy_user_name, self.proxy_password)
-                    req_obj.auth = proxy_auth_details
+            req_obj = self.get_request_obj()
 
             if bool(files):
                 resp_obj = req_obj.post(request_url, params = parameters, files = files, headers = request_headers)
@@ -2575,16 +2569,7 @@ class AnalyticsClient:
 
             request_headers["User-Agent"] = "zoho-analytics-mcp-server"
             
-            req_obj = req_obj = requests.Session()
-            if self.proxy:
-                proxy_details = {
-                    "http" : "http://" + self.proxy_host + ":" + self.proxy_port,
-                    "https": "http://" + self.proxy_host + ":" + self.proxy_port
-                }
-                req_obj.proxies = proxy_details
-                if self.proxy_user_name != None and self.proxy_password != None:
-                    proxy_auth_details = HTTPProxyDigestAuth(self.proxy_user_name, self.proxy_password)
-                    req_obj.auth = proxy_auth_details
+            req_obj = self.get_request_obj()
 
             resp_obj = req_obj.get(request_url, params = parameters, headers = request_headers)
             
@@ -2639,16 +2624,7 @@ class AnalyticsClient:
 
             request_headers["User-Agent"] = "zoho-analytics-mcp-server"
 
-            req_obj = req_obj = requests.Session()
-            if self.proxy:
-                proxy_details = {
-                    "http" : "http://" + self.proxy_host + ":" + self.proxy_port,
-                    "https": "http://" + self.proxy_host + ":" + self.proxy_port
-                }
-                req_obj.proxies = proxy_details
-                if self.proxy_user_name != None and self.proxy_password != None:
-                    proxy_auth_details = HTTPProxyDigestAuth(self.proxy_user_name, self.proxy_password)
-                    req_obj.auth = proxy_auth_details
+            req_obj = self.get_request_obj()
 
             resp_obj = None
 
@@ -2669,8 +2645,12 @@ class AnalyticsClient:
 
     def get_request_obj(self):
         """
-        Internal method for getting OAuth token.
+        Internal method returning the HTTP session shared by all requests of this client,
+        so connections (and TLS sessions) are kept alive between API calls.
         """
+        if self._session is not None:
+            return self._session
+
         req_obj = requests.Session()
             
         if self.proxy:
@@ -2682,6 +2662,7 @@ class AnalyticsClient:
             if self.proxy_user_name != None and self.proxy_password != None:
                 proxy_auth_details = HTTPProxyDigestAuth(self.proxy_user_name, self.proxy_password)
                 req_obj.auth = proxy_auth_details
+        self._session = req_obj
         return req_obj
 
 
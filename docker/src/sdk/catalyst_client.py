@@ -1,7 +1,25 @@
-import json
+import asyncio
+import math
+import time
 import urllib.parse
-import requests
-from typing import Optional, Dict, Any
+import httpx
+import orjson
+from typing import Optional, Dict, Any, Iterable, List, Tuple
+
+
+# Refresh the access token this many seconds before it actually expires so that
+# requests in flight never race the expiry on the server side.
+TOKEN_REFRESH_LEEWAY_SECONDS = 30
+
+# mget/mset requests arriving within this window are coalesced into one batch.
+BATCH_WINDOW_SECONDS = 0.002
+BATCH_MAX_SIZE = 50
+
+# Connection pool shared by the requests of one client. Idle connections are kept
+# well past typical request gaps so bursts reuse warm TLS sessions.
+HTTP_POOL_LIMITS = httpx.Limits(max_keepalive_connections=50, max_connections=200, keepalive_expiry=90)
+
+_UNPARSED = object()
 
 
 class AuthConfig:
@@ -12,18 +30,33 @@ class AuthConfig:
         self.client_secret = client_secret
         self.refresh_token = refresh_token
         self.access_token = access_token
+        self.auth_header = f"Zoho-oauthtoken {access_token}"
+        # Monotonic deadline after which the token must be refreshed. A token supplied
+        # up front has an unknown lifetime, so it is trusted until the server rejects it.
+        self.expiry = math.inf if access_token else 0.0
     
-    def set_access_token(self, token: str):
-        """Update the access token."""
+    def set_access_token(self, token: str, expires_in: Optional[int] = None):
+        """Update the access token and its (optional) lifetime in seconds."""
         self.access_token = token
+        self.auth_header = f"Zoho-oauthtoken {token}"
+        if expires_in is None:
+            self.expiry = math.inf
+        else:
+            self.expiry = time.monotonic() + int(expires_in) - TOKEN_REFRESH_LEEWAY_SECONDS
+
+    def is_expired(self) -> bool:
+        """Whether the access token is missing or about to expire."""
+        return self.expiry <= time.monotonic()
 
 
 class ServerError(Exception):
     """Exception raised for server errors."""
     
-    def __init__(self, message: str, is_oauth_error: bool = False):
+    def __init__(self, message: str, is_oauth_error: bool = False, status_code: Optional[int] = None):
         self.message = message
         self.is_oauth_error = is_oauth_error
+        # HTTP status of the failed call; None when no response was received
+        self.status_code = status_code
         super().__init__(self.message)
 
 
@@ -33,16 +66,25 @@ class ResponseObject:
     def __init__(self, status_code: int, resp_content: str):
         self.status_code = status_code
         self.resp_content = resp_content
+        self.ok = 200 <= status_code < 300
+        self._parsed: Any = _UNPARSED
 
+    def json(self) -> Any:
+        """Parse the response body as JSON, once."""
+        if self._parsed is _UNPARSED:
+            self._parsed = orjson.loads(self.resp_content)
+        return self._parsed
 
-class CatalystCache:
+
+class AsyncCatalystCache:
     """
-    Sync Python wrapper for Catalyst Cache operations.
-    
-    Provides synchronous methods to insert, get, update, and delete cache key-value pairs
-    in Catalyst Cache segments with automatic OAuth token refresh.
+    Async Python wrapper for Catalyst Cache operations.
+
+    Every operation is a coroutine, so independent cache operations can be issued
+    concurrently (e.g. with asyncio.gather) and complete in roughly one round trip
+    instead of one per key.
     """
-    
+
     def __init__(
         self,
         client_id: str,
@@ -55,8 +97,8 @@ class CatalystCache:
         access_token: str = ""
     ):
         """
-        Initialize the CatalystCache client.
-        
+        Initialize the AsyncCatalystCache client.
+
         Args:
             client_id: OAuth client ID
             client_secret: OAuth client secret
@@ -73,158 +115,205 @@ class CatalystCache:
         self.api_domain = api_domain.rstrip('/')
         self.accounts_server_url = accounts_server_url.rstrip('/')
         self.base_url = f"{self.api_domain}/baas/v1/project/{self.project_id}/segment/{self.segment_id}/cache"
-        self._session: Optional[requests.Session] = None
-    
-    def __enter__(self):
-        """Context manager entry."""
-        self._ensure_session()
+        # httpx.AsyncClient and asyncio.Lock are bound to the loop they are first used
+        # on, so both are kept per event loop rather than shared across loops.
+        self._clients: Dict[int, httpx.AsyncClient] = {}
+        self._refresh_locks: Dict[int, asyncio.Lock] = {}
+        self._batch_queues: Dict[int, asyncio.Queue] = {}
+        self._batch_workers: Dict[int, asyncio.Task] = {}
+        self._refresh_header_cache()
+
+    async def __aenter__(self):
+        """Async context manager entry."""
+        self._get_client()
         return self
-    
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.close()
-    
-    def _ensure_session(self):
-        """Ensure a requests session exists."""
-        if self._session is None:
-            self._session = requests.Session()
-    
-    def close(self):
-        """Close the requests session."""
-        if self._session:
-            self._session.close()
-            self._session = None
-    
-    def _get_headers(self, content_type: Optional[str] = None) -> Dict[str, str]:
-        """Get HTTP headers with OAuth token."""
-        headers = {
-            "Authorization": f"Zoho-oauthtoken {self.auth.access_token}"
-        }
-        if content_type:
-            headers["Content-Type"] = content_type
-        return headers
-    
-    def submit_request(self, method: str, url: str, data: Any = None, params: Dict = None) -> ResponseObject:
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the HTTP client for the running event loop, creating it if needed."""
+        loop_id = id(asyncio.get_running_loop())
+        client = self._clients.get(loop_id)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                http2=True,
+                limits=HTTP_POOL_LIMITS,
+                timeout=10.0,
+            )
+            self._clients[loop_id] = client
+            self._refresh_locks[loop_id] = asyncio.Lock()
+        return client
+
+    def _get_refresh_lock(self) -> asyncio.Lock:
+        """Return the token refresh lock for the running event loop."""
+        self._get_client()
+        return self._refresh_locks[id(asyncio.get_running_loop())]
+
+    async def close(self):
+        """Close the HTTP client and batch worker bound to the running event loop."""
+        loop_id = id(asyncio.get_running_loop())
+        worker = self._batch_workers.pop(loop_id, None)
+        self._batch_queues.pop(loop_id, None)
+        if worker is not None:
+            worker.cancel()
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        client = self._clients.pop(loop_id, None)
+        self._refresh_locks.pop(loop_id, None)
+        if client is not None:
+            await client.aclose()
+
+    def _refresh_header_cache(self):
+        """
+        Rebuild the request headers for the current access token.
+
+        The dicts are shared by every request until the next token refresh, so they
+        must not be mutated by callers.
+        """
+        self._headers_plain = {"Authorization": self.auth.auth_header}
+        self._headers_json = {**self._headers_plain, "Content-Type": "application/json"}
+
+    async def submit_request(self, method: str, url: str, data: Any = None, params: Dict = None) -> ResponseObject:
         """
         Submit an HTTP request.
-        
+
         Args:
             method: HTTP method (GET, POST, PUT, DELETE)
             url: Request URL
             data: Request data/body
             params: Query parameters
-        
+
         Returns:
             ResponseObject containing status code and content
-        
+
         Raises:
             ServerError: If request fails
         """
-        self._ensure_session()
-        
+        client = self._get_client()
+
         try:
             if method == "POST" and isinstance(data, str):
                 # For OAuth token request with URL-encoded data
                 headers = {"Content-Type": "application/x-www-form-urlencoded"}
-                response = self._session.post(url, data=data, headers=headers)
+                response = await client.post(url, content=data, headers=headers)
                 return ResponseObject(response.status_code, response.text)
-            else:
-                headers = self._get_headers("application/json" if data and method in ["POST", "PUT"] else None)
-                
-                if method == "GET":
-                    response = self._session.get(url, headers=headers, params=params)
-                elif method == "POST":
-                    response = self._session.post(url, headers=headers, json=data)
-                elif method == "PUT":
-                    response = self._session.put(url, headers=headers, json=data)
-                elif method == "DELETE":
-                    response = self._session.delete(url, headers=headers, params=params)
-                else:
-                    raise ValueError(f"Unsupported HTTP method: {method}")
-                
-                return ResponseObject(response.status_code, response.text)
-        
-        except requests.RequestException as e:
+
+            if method not in ("GET", "POST", "PUT", "DELETE"):
+                raise ValueError(f"Unsupported HTTP method: {method}")
+
+            headers = self._headers_json if data and method in ("POST", "PUT") else self._headers_plain
+            response = await client.request(
+                method,
+                url,
+                headers=headers,
+                params=params,
+                json=data if method in ("POST", "PUT") else None,
+            )
+            return ResponseObject(response.status_code, response.text)
+
+        except httpx.HTTPError as e:
             raise ServerError(str(e))
-    
+
     def is_oauth_expired(self, resp_obj: ResponseObject) -> bool:
         """
         Check whether the access token has expired.
-        
+
         Args:
             resp_obj: Response object from API call
-        
+
         Returns:
             True if OAuth token expired, False otherwise
         """
         try:
-            resp_content = json.loads(resp_obj.resp_content)
-            err_code = resp_content["data"]["error_code"]
+            err_code = resp_obj.json()["data"]["error_code"]
             return err_code == "AUTHENTICATION_FAILURE" # NEED TO VERIFY I18N
         except Exception:
             return False
-    
-    def regenerate_analytics_oauth_token(self):
+
+    async def regenerate_analytics_oauth_token(self, stale_token: Optional[str] = None):
         """
         Refresh the OAuth access token using the refresh token.
-        
+
+        Concurrent callers are serialized on a lock. A caller that passes the token
+        it saw rejected skips the refresh if another caller has already replaced it,
+        so a burst of expired requests triggers a single refresh.
+
+        Args:
+            stale_token: The access token the caller observed as expired (optional)
+
         Raises:
             ServerError: If token refresh fails
         """
-        oauth_params = {
-            "client_id": self.auth.client_id,
-            "client_secret": self.auth.client_secret,
-            "refresh_token": self.auth.refresh_token,
-            "grant_type": "refresh_token"
-        }
-        oauth_params = urllib.parse.urlencode(oauth_params)
-        req_url = f"{self.accounts_server_url}/oauth/v2/token"
-        oauth_resp_obj = self.submit_request("POST", req_url, oauth_params)
-        
-        if oauth_resp_obj.status_code == 200:
-            oauth_json_resp = json.loads(oauth_resp_obj.resp_content)
-            if "access_token" in oauth_json_resp:
-                self.auth.set_access_token(oauth_json_resp["access_token"])
+        async with self._get_refresh_lock():
+            if stale_token is not None and self.auth.access_token != stale_token and not self.auth.is_expired():
                 return
-        
-        raise ServerError(oauth_resp_obj.resp_content, True)
-    
-    def _execute_with_retry(self, method: str, url: str, data: Any = None, params: Dict = None) -> ResponseObject:
+
+            oauth_params = {
+                "client_id": self.auth.client_id,
+                "client_secret": self.auth.client_secret,
+                "refresh_token": self.auth.refresh_token,
+                "grant_type": "refresh_token"
+            }
+            oauth_params = urllib.parse.urlencode(oauth_params)
+            req_url = f"{self.accounts_server_url}/oauth/v2/token"
+            oauth_resp_obj = await self.submit_request("POST", req_url, oauth_params)
+
+            if oauth_resp_obj.status_code == 200:
+                oauth_json_resp = oauth_resp_obj.json()
+                if "access_token" in oauth_json_resp:
+                    self.auth.set_access_token(
+                        oauth_json_resp["access_token"],
+                        oauth_json_resp.get("expires_in"),
+                    )
+                    self._refresh_header_cache()
+                    return
+
+            raise ServerError(oauth_resp_obj.resp_content, True)
+
+    async def _execute_with_retry(self, method: str, url: str, data: Any = None, params: Dict = None) -> ResponseObject:
         """
         Execute request with automatic token refresh and retry on OAuth expiry.
-        
+
         Args:
             method: HTTP method
             url: Request URL
             data: Request data/body
             params: Query parameters
-        
+
         Returns:
             ResponseObject from successful request
-        
+
         Raises:
             ServerError: If request fails after retry
         """
-        resp_obj = self.submit_request(method, url, data, params)
-        
+        if self.auth.is_expired():
+            await self.regenerate_analytics_oauth_token(self.auth.access_token)
+
+        token = self.auth.access_token
+        resp_obj = await self.submit_request(method, url, data, params)
+
         # Check if token expired and retry once
-        if not str(resp_obj.status_code).startswith('2') and self.is_oauth_expired(resp_obj):
-            self.regenerate_analytics_oauth_token()
-            resp_obj = self.submit_request(method, url, data, params)
-        
+        if not resp_obj.ok and self.is_oauth_expired(resp_obj):
+            await self.regenerate_analytics_oauth_token(token)
+            resp_obj = await self.submit_request(method, url, data, params)
+
         return resp_obj
-    
-    def insert(self, cache_name: str, cache_value: str, expiry_in_hours: Optional[int] = None) -> Dict[str, Any]:
+
+    async def insert(self, cache_name: str, cache_value: str, expiry_in_hours: Optional[int] = None) -> Dict[str, Any]:
         """
         Insert a key-value pair in the cache segment.
-        
+
         Args:
             cache_name: Name/key of the cache item
             cache_value: Value to store
             expiry_in_hours: Expiry time in hours (optional)
-        
+
         Returns:
             API response as dictionary
-        
+
         Raises:
             ServerError: If request fails
         """
@@ -232,49 +321,49 @@ class CatalystCache:
             "cache_name": cache_name,
             "cache_value": cache_value
         }
-        
+
         if expiry_in_hours is not None:
             payload["expiry_in_hours"] = expiry_in_hours
-        
-        resp_obj = self._execute_with_retry("POST", self.base_url, payload)
-        
-        if str(resp_obj.status_code).startswith('2'):
-            return json.loads(resp_obj.resp_content)
+
+        resp_obj = await self._execute_with_retry("POST", self.base_url, payload)
+
+        if resp_obj.ok:
+            return resp_obj.json()
         else:
-            raise ServerError(f"Failed to insert cache: {resp_obj.resp_content}")
-    
-    def get(self, cache_key: str) -> Dict[str, Any]:
+            raise ServerError(f"Failed to insert cache: {resp_obj.resp_content}", status_code=resp_obj.status_code)
+
+    async def get(self, cache_key: str) -> Dict[str, Any]:
         """
         Get the value of a cache key.
-        
+
         Args:
             cache_key: Key of the cache item to retrieve
-        
+
         Returns:
             API response as dictionary containing the cache value
-        
+
         Raises:
             ServerError: If request fails
         """
         params = {"cacheKey": cache_key}
-        resp_obj = self._execute_with_retry("GET", self.base_url, params=params)
-        
-        if str(resp_obj.status_code).startswith('2'):
-            return json.loads(resp_obj.resp_content)
+        resp_obj = await self._execute_with_retry("GET", self.base_url, params=params)
+
+        if resp_obj.ok:
+            return resp_obj.json()
         else:
-            raise ServerError(f"Failed to get cache: {resp_obj.resp_content}")
-    
-    def update(self, cache_name: str, cache_value: str) -> Dict[str, Any]:
+            raise ServerError(f"Failed to get cache: {resp_obj.resp_content}", status_code=resp_obj.status_code)
+
+    async def update(self, cache_name: str, cache_value: str) -> Dict[str, Any]:
         """
         Update the value of an existing cache key.
-        
+
         Args:
             cache_name: Name/key of the cache item to update
             cache_value: New value
-        
+
         Returns:
             API response as dictionary
-        
+
         Raises:
             ServerError: If request fails
         """
@@ -282,31 +371,135 @@ class CatalystCache:
             "cache_name": cache_name,
             "cache_value": cache_value
         }
-        
-        resp_obj = self._execute_with_retry("PUT", self.base_url, payload)
-        
-        if str(resp_obj.status_code).startswith('2'):
-            return json.loads(resp_obj.resp_content)
+
+        resp_obj = await self._execute_with_retry("PUT", self.base_url, payload)
+
+        if resp_obj.ok:
+            return resp_obj.json()
         else:
-            raise ServerError(f"Failed to update cache: {resp_obj.resp_content}")
-    
-    def delete(self, cache_key: str) -> Dict[str, Any]:
+            raise ServerError(f"Failed to update cache: {resp_obj.resp_content}", status_code=resp_obj.status_code)
+
+    async def delete(self, cache_key: str) -> Dict[str, Any]:
         """
         Delete a cache key from the segment.
-        
+
         Args:
             cache_key: Key of the cache item to delete
-        
+
         Returns:
             API response as dictionary
-        
+
         Raises:
             ServerError: If request fails
         """
         params = {"cacheKey": cache_key}
-        resp_obj = self._execute_with_retry("DELETE", self.base_url, params=params)
-        
-        if str(resp_obj.status_code).startswith('2'):
-            return json.loads(resp_obj.resp_content)
+        resp_obj = await self._execute_with_retry("DELETE", self.base_url, params=params)
+
+        if resp_obj.ok:
+            return resp_obj.json()
         else:
-            raise ServerError(f"Failed to delete cache: {resp_obj.resp_content}")
\ No newline at end of file
+            raise ServerError(f"Failed to delete cache: {resp_obj.resp_content}", status_code=resp_obj.status_code)
+
+    async def mget(self, cache_keys: Iterable[str]) -> List[Dict[str, Any]]:
+        """
+        Get the values of several cache keys.
+
+        Lookups from concurrent callers are coalesced over a short window, see
+        _run_batch_worker.
+
+        Args:
+            cache_keys: Keys of the cache items to retrieve
+
+        Returns:
+            API responses as dictionaries, in the order of cache_keys
+
+        Raises:
+            ServerError: If any request fails
+        """
+        futures = [self._enqueue_batch_op(("GET", cache_key, None, None)) for cache_key in cache_keys]
+        return list(await asyncio.gather(*futures))
+
+    async def mset(self, items: Iterable[Tuple[str, str]], expiry_in_hours: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Insert several key-value pairs in the cache segment.
+
+        Args:
+            items: (cache_name, cache_value) pairs to store
+            expiry_in_hours: Expiry time in hours applied to every item (optional)
+
+        Returns:
+            API responses as dictionaries, in the order of items
+
+        Raises:
+            ServerError: If any request fails
+        """
+        futures = [
+            self._enqueue_batch_op(("POST", cache_name, cache_value, expiry_in_hours))
+            for cache_name, cache_value in items
+        ]
+        return list(await asyncio.gather(*futures))
+
+    def _enqueue_batch_op(self, op: Tuple[str, str, Any, Optional[int]]) -> asyncio.Future:
+        """Queue a cache operation for the batch worker and return its future."""
+        loop = asyncio.get_running_loop()
+        loop_id = id(loop)
+        queue = self._batch_queues.get(loop_id)
+        if queue is None:
+            queue = self._batch_queues[loop_id] = asyncio.Queue()
+        worker = self._batch_workers.get(loop_id)
+        if worker is None or worker.done():
+            self._batch_workers[loop_id] = loop.create_task(self._run_batch_worker(queue))
+        future = loop.create_future()
+        queue.put_nowait((op, future))
+        return future
+
+    async def _run_batch_worker(self, queue: asyncio.Queue):
+        """
+        Drain the batch queue until cancelled.
+
+        After the first pending operation arrives, further ones are collected until
+        either BATCH_MAX_SIZE is reached or BATCH_WINDOW_SECONDS have elapsed.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + BATCH_WINDOW_SECONDS
+            while len(batch) < BATCH_MAX_SIZE:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._submit_batch(batch)
+
+    async def _submit_batch(self, batch: List[Tuple[Tuple[str, str, Any, Optional[int]], asyncio.Future]]):
+        """
+        Execute a batch of queued operations and resolve their futures.
+
+        Catalyst Cache has no bulk endpoint, so identical operations are deduplicated
+        and the remaining ones are issued concurrently over the shared connection.
+        """
+        pending: Dict[Tuple[str, str, Any, Optional[int]], List[asyncio.Future]] = {}
+        for op, future in batch:
+            pending.setdefault(op, []).append(future)
+
+        ops = list(pending)
+        results = await asyncio.gather(*(self._run_batch_op(op) for op in ops), return_exceptions=True)
+
+        for op, result in zip(ops, results):
+            for future in pending[op]:
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    async def _run_batch_op(self, op: Tuple[str, str, Any, Optional[int]]) -> Dict[str, Any]:
+        """Execute a single queued operation."""
+        method, cache_name, cache_value, expiry_in_hours = op
+        if method == "GET":
+            return await self.get(cache_name)
+        return await self.insert(cache_name, cache_value, expiry_in_hours)
@@ -1,9 +1,19 @@
 import asyncio
-from redis.asyncio import Redis
+import socket
+from redis.asyncio import BlockingConnectionPool, Redis
 from typing import Optional
 from src.config import Settings
 
 
+def keepalive_options() -> dict:
+    """TCP keep-alive tuning, limited to the options the platform supports."""
+    options = {}
+    for name, value in (("TCP_KEEPIDLE", 60), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3)):
+        if hasattr(socket, name):
+            options[getattr(socket, name)] = value
+    return options
+
+
 class RedisClientSingleton:
     _instance: Optional[Redis] = None
     _lock = asyncio.Lock()
@@ -13,18 +23,26 @@ class RedisClientSingleton:
         if cls._instance is None:
             async with cls._lock:
                 if cls._instance is None:
-                    cls._instance = Redis(
+                    # A blocking pool makes bursts wait for a free connection instead of
+                    # failing once max_connections is reached.
+                    pool = BlockingConnectionPool(
                         host=Settings.REDIS_HOST,
                         port=Settings.REDIS_PORT,
                         password=Settings.REDIS_PASSWORD,
-                        decode_responses=True,
-                        max_connections=35,
+                        # Callers only read integer replies (token bucket script),
+                        # so replies are left as bytes rather than decoded to str
+                        max_connections=Settings.REDIS_POOL_SIZE,
+                        timeout=Settings.REDIS_POOL_TIMEOUT,
+                        socket_keepalive=True,
+                        socket_keepalive_options=keepalive_options(),
                     )
+                    cls._instance = Redis(connection_pool=pool)
                     await cls._instance.ping()
         return cls._instance
 
     @classmethod
     async def close(cls):
         if cls._instance:
-            await cls._instance.close()
-            cls._instance = None
\ No newline at end of file
+            await cls._instance.aclose()
+            await cls._instance.connection_pool.disconnect()
+            cls._instance = None
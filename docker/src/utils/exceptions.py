@@ -1,6 +1,6 @@
 from fastapi.exceptions import RequestValidationError
 from requests import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from src.logging_util import get_logger
 import time
 from fastapi import status
@@ -44,7 +44,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         }
     )
 
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         content={
             "success": False,
@@ -1,6 +1,6 @@
 import anyio
 from starlette.types import ASGIApp, Receive, Scope, Send
-from starlette.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from starlette.datastructures import Headers, MutableHeaders
 from starlette.requests import Request
 from src.logging_util import get_logger
@@ -60,7 +60,7 @@ class MaxBodySizeMiddleware:
             if self.close_connection_on_reject:
                 extra_headers["Connection"] = "close"
 
-            response = JSONResponse(
+            response = ORJSONResponse(
                 {"detail": detail},
                 status_code=status_code,
                 headers=extra_headers if extra_headers else None,
@@ -147,7 +147,7 @@ class GlobalRateLimiterMiddleware:
         client_ip = get_client_ip(request)
         if not client_ip:
             logger.warning("Could not determine client IP for rate limiting")
-            response = JSONResponse(
+            response = ORJSONResponse(
                 status_code=400,
                 content="Unable to determine client IP for rate limiting.",
             )
@@ -156,15 +156,15 @@ class GlobalRateLimiterMiddleware:
 
         try:
             if not await rate_limiter.allow(client_ip):
-                logger.warning(f"Rate limit exceeded for IP: {client_ip}")
-                response = JSONResponse(
+                logger.warning("Rate limit exceeded for IP: %s", client_ip)
+                response = ORJSONResponse(
                     status_code=429,
                     content={"detail": self.error_message},
                 )
                 await response(scope, receive, send)
                 return
         except Exception as e:
-            logger.error(f"Error checking rate limit: {e}")
+            logger.error("Error checking rate limit: %s", e)
             await self.app(scope, receive, send)
             return
 
@@ -23,7 +23,7 @@ Background:
   In testing we call /auth/callback directly.  We can:
   • Obtain a real transaction_id via /register → /authorize and use it as
     `state` to exercise the full happy path (302 redirect to client).
-  • Use an arbitrary fake `state` value (within max_length=100) to exercise
+  • Use an arbitrary fake `state` value (within max_length=4096) to exercise
     the "invalid transaction" error path (400) while still consuming a token
     in the rate-limit bucket.
 
@@ -55,7 +55,7 @@ STANDARD_RATE_LIMIT_WINDOW = int(os.getenv("PRIVATE_OAUTH_STANDARD_RATE_LIMIT_WI
 # ── Configurable /auth/callback query-parameter constraints ───────────────────
 # Mirror Query(...) annotations in remote_auth.py
 MAX_CODE_LENGTH     = 100
-MAX_STATE_LENGTH    = 100
+MAX_STATE_LENGTH    = 4096  # state is the signed transaction_id JWT
 MAX_LOCATION_LENGTH = 200
 
 # ── Fixed test values ─────────────────────────────────────────────────────────
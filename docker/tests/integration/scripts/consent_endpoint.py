@@ -50,8 +50,9 @@ STANDARD_RATE_LIMIT_COUNT  = int(os.getenv("PRIVATE_OAUTH_STANDARD_RATE_LIMIT_CO
 STANDARD_RATE_LIMIT_WINDOW = int(os.getenv("PRIVATE_OAUTH_STANDARD_RATE_LIMIT_WINDOW", "60"))
 
 # ── Configurable field constraints (mirror remote_auth.py Query/Form annotations) ─
-MAX_TRANSACTION_ID_LENGTH = 100   # Query(..., max_length=100) on /consent
-                                   # Form(...,  max_length=100) on /consent/approve
+MAX_TRANSACTION_ID_LENGTH = 4096  # Query(..., max_length=4096) on /consent
+                                   # Form(...,  max_length=4096) on /consent/approve
+                                   # (transaction_id is a signed JWT)
 
 # ── Fixed test values ─────────────────────────────────────────────────────────
 VALID_REDIRECT_URI = "https://example.com/callback"
@@ -368,7 +369,7 @@ def test_consent_large_flood():
     # Use a max-length (but valid format) transaction_id after the real one
     # is consumed, to measure payload-handling cost per request.
     # For the initial requests use the real transaction_id (triggers full path).
-    max_txn_id = transaction_id   # real UUID-format id, well within 100 chars
+    max_txn_id = transaction_id   # real signed transaction id, within MAX_TRANSACTION_ID_LENGTH
 
     NUM_WINDOWS         = 3
     REQUESTS_PER_WINDOW = STANDARD_RATE_LIMIT_COUNT - 1
@@ -0,0 +1,68 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+import src.auth.remote_auth as remote_auth
+from src import config
+
+
+HEADERS = [
+    ("Bearer abc.DEF-123_~+/=", True),
+    ("bearer abc", True),
+    ("Bearer  abc", False),      # two spaces
+    ("Bearer abc ", False),      # trailing space
+    ("Bearer abc def", False),
+    ("Bearer abc\tdef", False),
+    ("Bearer abéc", False),  # non-ASCII
+    ("Bearer ", False),
+    ("Basic abc", False),
+]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # 401 responses point at the protected resource metadata under the public URL
+    monkeypatch.setattr(remote_auth.Settings, "MCP_SERVER_PUBLIC_URL", "https://mcp.example.com")
+    remote_auth._urls.cache_clear()
+    app = FastAPI()
+    app.add_middleware(remote_auth.AuthMiddleware)
+
+    @app.get("/tool")
+    def tool():
+        return {"ok": True}
+
+    limiter = MagicMock()
+    limiter.allow = AsyncMock(return_value=True)
+    app.state.global_rate_limiter = limiter
+    remote_auth._validated_tokens.clear()
+    with patch.object(remote_auth, "_fetch_user_orgs", AsyncMock(return_value=[{"orgId": 1}])), \
+            patch.object(remote_auth, "get_client_ip", return_value="1.1.1.1"), \
+            patch.object(remote_auth.Settings, "get_allowed_org_ids", return_value=frozenset({"1"})):
+        yield TestClient(app)
+    remote_auth._validated_tokens.clear()
+    remote_auth._urls.cache_clear()
+
+
+def tools_accept(header: str) -> bool:
+    request = MagicMock()
+    request.headers = {"Authorization": header}
+    with patch.object(config, "get_http_request", return_value=request):
+        try:
+            config.get_access_token()
+        except HTTPException:
+            return False
+    return True
+
+
+class TestAuthorizationHeader:
+
+    @pytest.mark.parametrize("header,accepted", HEADERS)
+    def test_middleware(self, client, header, accepted):
+        response = client.get("/tool", headers={"Authorization": header.encode("latin-1")})
+        assert (response.status_code == 200) is accepted
+
+    @pytest.mark.parametrize("header,accepted", HEADERS)
+    def test_middleware_and_tools_agree(self, client, header, accepted):
+        response = client.get("/tool", headers={"Authorization": header.encode("latin-1")})
+        assert (response.status_code == 200) is tools_accept(header)
@@ -0,0 +1,195 @@
+import asyncio
+import base64
+import hashlib
+from datetime import datetime, timedelta, UTC
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import fakeredis.aioredis
+import httpx
+import pytest
+from fastapi import HTTPException
+
+import src.auth.remote_auth as remote_auth
+from src.auth import persistence
+from src.auth.persistence import InMemoryProvider, RedisProvider
+from src.auth.remote_auth import AuthorizationCode, _auth_code_key
+
+CLIENT_ID = "client-1"
+CLIENT_SECRET = "client-secret"
+REDIRECT_URI = "https://example.com/callback"
+VERIFIER = "v" * 43
+CODE = "proxy-code"
+TOKENS = {"access_token": "at", "token_type": "Bearer"}
+
+
+def challenge(verifier: str) -> str:
+    return base64.urlsafe_b64encode(hashlib.sha256(verifier.encode()).digest()).rstrip(b"=").decode()
+
+
+def auth_code() -> AuthorizationCode:
+    now = datetime.now(UTC)
+    return AuthorizationCode(
+        created_at=now,
+        expires_at=now + timedelta(seconds=120),
+        transaction_id="txn",
+        client_id=CLIENT_ID,
+        redirect_uri=REDIRECT_URI,
+        code_challenge=challenge(VERIFIER),
+        code_challenge_method="S256",
+        upstream_location="us",
+        upstream_code="upstream-code",
+    )
+
+
+def exchange(code=CODE, client_id=CLIENT_ID, code_verifier=VERIFIER):
+    return remote_auth.token_exchange(
+        grant_type="authorization_code",
+        code=code,
+        redirect_uri=REDIRECT_URI,
+        client_id=client_id,
+        client_secret=CLIENT_SECRET,
+        refresh_token=None,
+        code_verifier=code_verifier,
+    )
+
+
+@pytest.fixture
+def upstream():
+    async def slow_exchange(payload):
+        await asyncio.sleep(0.01)
+        return dict(TOKENS)
+
+    return AsyncMock(side_effect=slow_exchange)
+
+
+@pytest.fixture
+def store():
+    return InMemoryProvider(AuthorizationCode)
+
+
+@pytest.fixture
+def token_endpoint(store, upstream):
+    clients = MagicMock()
+    clients.get = AsyncMock(return_value=MagicMock(secret=CLIENT_SECRET))
+    remote_auth._recent_code_exchanges.clear()
+    with patch.object(remote_auth, "registed_clients_store", clients), \
+            patch.object(remote_auth, "auth_codes_store", store), \
+            patch.object(remote_auth, "upstream_token_exchange", upstream):
+        yield
+    remote_auth._recent_code_exchanges.clear()
+
+
+@pytest.mark.usefixtures("token_endpoint")
+class TestCodeReplay:
+
+    @pytest.mark.asyncio
+    async def test_retry_with_same_client_and_verifier_gets_same_tokens(self, store, upstream):
+        await store.set(_auth_code_key(CODE), auth_code(), ttl_in_sec=120)
+
+        first = await exchange()
+        retry = await exchange()
+
+        assert first.body == retry.body
+        assert upstream.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_retries_share_one_upstream_call(self, store, upstream):
+        await store.set(_auth_code_key(CODE), auth_code(), ttl_in_sec=120)
+
+        responses = await asyncio.gather(*(exchange() for _ in range(3)))
+
+        assert {response.body for response in responses} == {responses[0].body}
+        assert upstream.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_retry_with_different_verifier_is_rejected(self, store):
+        await store.set(_auth_code_key(CODE), auth_code(), ttl_in_sec=120)
+        await exchange()
+
+        with pytest.raises(HTTPException) as exc:
+            await exchange(code_verifier="w" * 43)
+        assert exc.value.detail == "invalid_grant"
+
+    @pytest.mark.asyncio
+    async def test_retry_without_verifier_is_rejected(self, store):
+        await store.set(_auth_code_key(CODE), auth_code(), ttl_in_sec=120)
+        await exchange()
+
+        with pytest.raises(HTTPException) as exc:
+            await exchange(code_verifier=None)
+        assert exc.value.detail == "invalid_grant"
+
+    @pytest.mark.asyncio
+    async def test_retry_from_different_client_is_rejected(self, store):
+        await store.set(_auth_code_key(CODE), auth_code(), ttl_in_sec=120)
+        await exchange()
+
+        with pytest.raises(HTTPException) as exc:
+            await exchange(client_id="client-2")
+        assert exc.value.detail == "invalid_grant"
+
+    @pytest.mark.asyncio
+    async def test_failed_exchange_is_replayed_as_502(self, store, upstream):
+        upstream.side_effect = httpx.ConnectError("upstream down")
+        await store.set(_auth_code_key(CODE), auth_code(), ttl_in_sec=120)
+
+        for _ in range(2):
+            with pytest.raises(HTTPException) as exc:
+                await exchange()
+            assert exc.value.status_code == 502
+        assert upstream.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_code_is_spent_after_replay_window(self, store, upstream):
+        await store.set(_auth_code_key(CODE), auth_code(), ttl_in_sec=120)
+        await exchange()
+        remote_auth._recent_code_exchanges.clear()
+
+        with pytest.raises(HTTPException) as exc:
+            await exchange()
+        assert exc.value.detail == "invalid_grant"
+        assert upstream.await_count == 1
+
+
+@pytest.fixture
+def redis_store():
+    server = fakeredis.aioredis.FakeRedis()
+    with patch.object(persistence, "_get_redis_pool", return_value=server.connection_pool):
+        store = RedisProvider(AuthorizationCode, host="fake", port=6379, prefix="ac")
+    execute_command = store.client.execute_command
+
+    async def network_bound_execute(*args, **kwargs):
+        # Yield like a real round trip, so concurrent redeems interleave between commands
+        await asyncio.sleep(0)
+        return await execute_command(*args, **kwargs)
+
+    store.client.execute_command = network_bound_execute
+    return store
+
+
+class TestSingleUseRedeem:
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("store_name", ["memory", "redis"])
+    async def test_concurrent_redeems_hand_out_the_code_once(self, request, store_name, upstream):
+        store = request.getfixturevalue("store" if store_name == "memory" else "redis_store")
+        code_key = _auth_code_key(CODE)
+        await store.set(code_key, auth_code(), ttl_in_sec=120)
+        remote_auth._recent_code_exchanges.clear()
+
+        with patch.object(remote_auth, "auth_codes_store", store), \
+                patch.object(remote_auth, "upstream_token_exchange", upstream):
+            results = await asyncio.gather(
+                *(remote_auth._redeem_authorization_code(code_key, CLIENT_ID, REDIRECT_URI, VERIFIER) for _ in range(5)),
+                return_exceptions=True,
+            )
+            redeemed = [result for result in results if not isinstance(result, BaseException)]
+            rejected = [result for result in results if isinstance(result, HTTPException)]
+
+            assert len(redeemed) == 1
+            assert len(rejected) == 4
+            assert all(exc.detail == "invalid_grant" for exc in rejected)
+            assert await redeemed[0] == TOKENS
+        assert upstream.await_count == 1
+        assert await store.get(code_key) is None
+        remote_auth._recent_code_exchanges.clear()
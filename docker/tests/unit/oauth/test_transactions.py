@@ -0,0 +1,78 @@
+import jwt
+import pytest
+from datetime import datetime, timedelta, UTC
+
+from src.auth.remote_auth import (
+    AuthorizationTransaction,
+    _TXN_JWT_ALGORITHM,
+    _decode_transaction,
+    _encode_transaction,
+)
+from src.config import Settings
+
+
+def make_transaction(**overrides) -> AuthorizationTransaction:
+    now = datetime.now(UTC).replace(microsecond=0)
+    fields = dict(
+        created_at=now,
+        expires_at=now + timedelta(seconds=120),
+        client_id="client-1",
+        redirect_uri="https://example.com/callback",
+        scope="ZohoAnalytics.fullaccess.all",
+        state="statevalue1",
+        code_challenge="c" * 43,
+        code_challenge_method="S256",
+    )
+    fields.update(overrides)
+    return AuthorizationTransaction(**fields)
+
+
+class TestTransactionToken:
+
+    def test_round_trip(self):
+        txn = make_transaction()
+        assert _decode_transaction(_encode_transaction(txn)) == txn
+
+    def test_round_trip_without_optional_fields(self):
+        txn = make_transaction(state=None, code_challenge=None, code_challenge_method=None)
+        token = _encode_transaction(txn)
+
+        claims = jwt.decode(token, options={"verify_signature": False})
+        assert not {"state", "cc", "ccm"} & claims.keys()
+        assert _decode_transaction(token) == txn
+
+    def test_tampered_signature_is_rejected(self):
+        token = _encode_transaction(make_transaction())
+        header, payload, signature = token.split(".")
+        tampered = signature[:-2] + ("AA" if signature[-2:] != "AA" else "BB")
+        assert _decode_transaction(f"{header}.{payload}.{tampered}") is None
+
+    def test_tampered_payload_is_rejected(self):
+        token = _encode_transaction(make_transaction())
+        forged = jwt.encode(
+            {**jwt.decode(token, options={"verify_signature": False}), "ruri": "https://evil.example"},
+            "not-the-signing-key",
+            algorithm=_TXN_JWT_ALGORITHM,
+        )
+        header, _, signature = token.split(".")
+        assert _decode_transaction(f"{header}.{forged.split('.')[1]}.{signature}") is None
+        assert _decode_transaction(forged) is None
+
+    @pytest.mark.parametrize("claim", ["cid", "ruri", "scope", "iat", "exp"])
+    def test_missing_required_claim_is_rejected(self, claim):
+        claims = jwt.decode(_encode_transaction(make_transaction()), options={"verify_signature": False})
+        del claims[claim]
+        token = jwt.encode(claims, Settings.OAUTH_TRANSACTION_SIGNING_KEY, algorithm=_TXN_JWT_ALGORITHM)
+        assert _decode_transaction(token) is None
+
+    def test_expired_transaction_still_decodes(self):
+        # Expiry is reported separately by the handlers
+        now = datetime.now(UTC).replace(microsecond=0)
+        txn = make_transaction(created_at=now - timedelta(hours=1), expires_at=now - timedelta(minutes=1))
+        assert _decode_transaction(_encode_transaction(txn)) == txn
+
+    def test_garbage_is_rejected(self):
+        assert _decode_transaction("not-a-jwt") is None
+
+    def test_signing_key_differs_from_session_key(self):
+        assert Settings.OAUTH_TRANSACTION_SIGNING_KEY != Settings.SESSION_SECRET_KEY
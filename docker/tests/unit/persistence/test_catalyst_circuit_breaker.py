@@ -0,0 +1,132 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from pydantic import BaseModel
+
+from src.auth import persistence
+from src.auth.persistence import CatalystCacheProvider, _CircuitBreaker
+from src.sdk.catalyst_client import ServerError
+
+
+class Item(BaseModel):
+    name: str
+
+
+def open_breaker(clock, fail_max=2, reset_timeout=30.0):
+    breaker = _CircuitBreaker("test", fail_max=fail_max, reset_timeout=reset_timeout)
+    clock.return_value = 100.0
+    for _ in range(fail_max):
+        breaker.record_failure()
+    return breaker
+
+
+class TestCircuitBreaker:
+
+    def test_closed_breaker_allows_calls(self):
+        breaker = _CircuitBreaker("test", fail_max=2)
+        breaker.record_failure()
+        assert breaker.allow() is True
+
+    @patch("src.auth.persistence.time.monotonic")
+    def test_open_breaker_blocks_calls(self, clock):
+        breaker = open_breaker(clock)
+        clock.return_value = 129.0
+        assert breaker.allow() is False
+
+    @patch("src.auth.persistence.time.monotonic")
+    def test_only_one_probe_is_let_through(self, clock):
+        breaker = open_breaker(clock)
+        clock.return_value = 130.0
+        assert breaker.allow() is True
+        assert breaker.allow() is False
+        assert breaker.allow() is False
+
+    @patch("src.auth.persistence.time.monotonic")
+    def test_open_probe_success_closes(self, clock):
+        breaker = open_breaker(clock)
+        clock.return_value = 130.0
+        assert breaker.allow() is True
+
+        breaker.record_success()
+
+        assert breaker.allow() is True
+        assert breaker.allow() is True
+
+    @patch("src.auth.persistence.time.monotonic")
+    def test_open_probe_failure_reopens(self, clock):
+        breaker = open_breaker(clock)
+        clock.return_value = 130.0
+        assert breaker.allow() is True
+
+        breaker.record_failure()
+
+        clock.return_value = 159.0
+        assert breaker.allow() is False
+        clock.return_value = 160.0
+        assert breaker.allow() is True
+
+    @patch("src.auth.persistence.time.monotonic")
+    def test_unanswered_probe_is_retried_after_timeout(self, clock):
+        breaker = open_breaker(clock)
+        clock.return_value = 130.0
+        assert breaker.allow() is True
+        clock.return_value = 160.0
+        assert breaker.allow() is True
+
+
+@pytest.fixture
+def provider():
+    client = MagicMock()
+    client.get = AsyncMock()
+    with patch.object(persistence, "_get_catalyst_cache", return_value=client):
+        provider = CatalystCacheProvider(Item, cfg=MagicMock(), prefix="t", segment_id="seg")
+    provider._breaker = _CircuitBreaker("test", fail_max=2)
+    yield provider
+    persistence._write_behind_providers.remove(provider)
+
+
+class TestCatalystReadErrors:
+
+    @pytest.mark.asyncio
+    async def test_server_errors_are_misses_and_open_the_breaker(self, provider):
+        provider._cache_client.get.side_effect = ServerError("boom", status_code=503)
+
+        assert await provider.get("a") is None
+        assert await provider.get("b") is None
+        assert provider._breaker.allow() is False
+
+        # Open: the backend is not called again
+        assert await provider.get("c") is None
+        assert provider._cache_client.get.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_transport_errors_without_status_count_as_failures(self, provider):
+        provider._cache_client.get.side_effect = ServerError("connection reset")
+        await provider.get("a")
+        assert provider._breaker._failures == 1
+
+    @pytest.mark.asyncio
+    async def test_parse_errors_are_misses(self, provider):
+        provider._cache_client.get.side_effect = ValueError("bad json")
+        assert await provider.get("a") is None
+        assert provider._breaker._failures == 1
+
+    @pytest.mark.asyncio
+    async def test_client_errors_do_not_count_as_failures(self, provider):
+        provider._breaker.record_failure()
+        provider._cache_client.get.side_effect = ServerError("unknown key", status_code=404)
+
+        assert await provider.get("a") is None
+        assert provider._breaker._failures == 0
+
+    @pytest.mark.asyncio
+    async def test_oauth_errors_are_raised(self, provider):
+        provider._cache_client.get.side_effect = ServerError("token expired", is_oauth_error=True, status_code=401)
+        with pytest.raises(ServerError):
+            await provider.get("a")
+
+    @pytest.mark.asyncio
+    async def test_programming_errors_are_raised(self, provider):
+        provider._cache_client.get.side_effect = TypeError("bug")
+        with pytest.raises(TypeError):
+            await provider.get("a")
+        assert provider._breaker._failures == 0
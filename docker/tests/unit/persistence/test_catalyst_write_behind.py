@@ -0,0 +1,149 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from pydantic import BaseModel
+
+from src.auth import persistence
+from src.auth.persistence import CatalystCacheProvider, CatalystWriteFlushMiddleware
+
+
+class Item(BaseModel):
+    name: str
+
+
+@pytest.fixture
+def cache_client():
+    client = MagicMock()
+    client.mset = AsyncMock(return_value=None)
+    client.get = AsyncMock(return_value=None)
+    client.delete = AsyncMock(return_value=None)
+    return client
+
+
+@pytest.fixture
+def make_provider(cache_client):
+    created = []
+
+    def _make(local_cache_ttl=0):
+        with patch.object(persistence, "_get_catalyst_cache", return_value=cache_client):
+            provider = CatalystCacheProvider(
+                Item, cfg=MagicMock(), prefix="t", segment_id="seg", local_cache_ttl=local_cache_ttl
+            )
+        created.append(provider)
+        return provider
+
+    yield _make
+    for provider in created:
+        persistence._write_behind_providers.remove(provider)
+
+
+def storing_app(provider, key="k"):
+    async def app(scope, receive, send):
+        await provider.set(key, Item(name="x"))
+        await send({"type": "http.response.start", "status": 201, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+    return app
+
+
+async def run(app):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    await CatalystWriteFlushMiddleware(app)({"type": "http"}, AsyncMock(), send)
+    return sent
+
+
+class TestCatalystWriteBehind:
+
+    @pytest.mark.asyncio
+    async def test_response_waits_for_request_writes(self, make_provider, cache_client):
+        provider = make_provider()
+        landed = []
+
+        async def slow_mset(pairs, expiry_in_hours=None):
+            await asyncio.sleep(0.01)
+            landed.extend(pairs)
+
+        cache_client.mset.side_effect = slow_mset
+        sent = await run(storing_app(provider))
+
+        assert landed == [("t:k", '{"name":"x"}')]
+        assert sent[0]["status"] == 201
+
+    @pytest.mark.asyncio
+    async def test_failed_write_fails_the_request(self, make_provider, cache_client):
+        provider = make_provider()
+        cache_client.mset.side_effect = RuntimeError("cache down")
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        with pytest.raises(RuntimeError, match="cache down"):
+            await CatalystWriteFlushMiddleware(storing_app(provider))({"type": "http"}, AsyncMock(), send)
+        # Nothing was sent, so the server can still answer with a 500
+        assert sent == []
+
+    @pytest.mark.asyncio
+    async def test_response_does_not_wait_for_other_requests_writes(self, make_provider, cache_client):
+        provider = make_provider()
+        release = asyncio.Event()
+
+        async def blocked_mset(pairs, expiry_in_hours=None):
+            await release.wait()
+
+        cache_client.mset.side_effect = blocked_mset
+        # Queued outside any request, e.g. by another request still in flight
+        await provider.set("other", Item(name="y"))
+
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+
+        sent = await asyncio.wait_for(run(app), timeout=1)
+        assert sent[0]["status"] == 200
+        release.set()
+        await provider.flush()
+
+    @pytest.mark.asyncio
+    async def test_local_cache_filled_only_after_write_lands(self, make_provider, cache_client):
+        provider = make_provider(local_cache_ttl=60)
+        cache_client.mset.side_effect = RuntimeError("cache down")
+
+        await provider.set("k", Item(name="x"))
+        await provider.flush()
+
+        assert "k" not in provider._local
+        assert await provider.get("k") is None
+
+    @pytest.mark.asyncio
+    async def test_local_cache_serves_landed_write(self, make_provider, cache_client):
+        provider = make_provider(local_cache_ttl=60)
+
+        await provider.set("k", Item(name="x"))
+        await provider.flush()
+
+        assert await provider.get("k") == Item(name="x")
+        cache_client.get.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_pending_write_overrides_locally_cached_value(self, make_provider, cache_client):
+        provider = make_provider(local_cache_ttl=60)
+        await provider.set("k", Item(name="a"))
+        await provider.flush()
+
+        release = asyncio.Event()
+
+        async def slow_mset(pairs, expiry_in_hours=None):
+            await release.wait()
+
+        cache_client.mset.side_effect = slow_mset
+        await provider.set("k", Item(name="b"))
+
+        reads = asyncio.gather(provider.get("k"), provider.get_many(["k"]))
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await reads == [Item(name="b"), [Item(name="b")]]
+        cache_client.get.assert_not_called()
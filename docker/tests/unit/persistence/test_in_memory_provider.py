@@ -0,0 +1,40 @@
+import pytest
+
+from src.auth.persistence import InMemoryProvider, PersistenceFactory
+from src.auth.remote_auth import StringList
+from src.config import Settings
+
+
+class TestInMemoryProvider:
+
+    @pytest.mark.asyncio
+    async def test_factory_builds_in_memory_provider(self, monkeypatch):
+        monkeypatch.setattr(Settings, "STORAGE_BACKEND", "memory")
+        monkeypatch.setattr(PersistenceFactory, "_instances", {})
+        assert type(PersistenceFactory.create(StringList, scope="ci")) is InMemoryProvider
+
+    @pytest.mark.asyncio
+    async def test_values_are_stored_encoded(self):
+        store = InMemoryProvider(StringList)
+        await store.set("k", StringList(["a"]))
+        assert isinstance(store._data["k"], bytes)
+
+    @pytest.mark.asyncio
+    async def test_mutating_a_read_value_does_not_change_the_stored_entry(self):
+        store = InMemoryProvider(StringList)
+        await store.set("k", StringList(["a"]))
+
+        value = await store.get("k")
+        value.root.append("b")
+
+        assert (await store.get("k")).root == ["a"]
+
+    @pytest.mark.asyncio
+    async def test_mutating_a_written_value_does_not_change_the_stored_entry(self):
+        store = InMemoryProvider(StringList)
+        value = StringList(["a"])
+        await store.set("k", value)
+
+        value.root.append("b")
+
+        assert (await store.get("k")).root == ["a"]
@@ -0,0 +1,55 @@
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+
+from src.auth import persistence
+from src.auth.persistence import RedisProvider, _redis_pipe_ctx
+from src.auth.remote_auth import StringList
+
+
+@pytest.fixture
+def store():
+    server = fakeredis.aioredis.FakeRedis()
+    with patch.object(persistence, "_get_redis_pool", return_value=server.connection_pool):
+        yield RedisProvider(StringList, host="fake", port=6379, prefix="t", local_cache_ttl=60)
+
+
+@pytest.fixture
+def request_pipe(store):
+    token = _redis_pipe_ctx.set(store.client.pipeline(transaction=False))
+    yield
+    _redis_pipe_ctx.reset(token)
+
+
+class TestRedisLocalCache:
+
+    @pytest.mark.asyncio
+    async def test_direct_write_is_served_locally(self, store):
+        await store.set("k", StringList(["a"]))
+        await store.set_many([("m", StringList(["b"]))])
+
+        assert "k" in store._local and "m" in store._local
+
+    @pytest.mark.asyncio
+    async def test_pipelined_write_is_not_served_before_it_lands(self, store):
+        await store.set("k", StringList(["a"]))
+        await store.set("m", StringList(["a"]))
+
+        token = _redis_pipe_ctx.set(store.client.pipeline(transaction=False))
+        try:
+            await store.set("k", StringList(["b"]))
+            await store.set_many([("m", StringList(["b"]))])
+        finally:
+            # The pipeline is dropped without executing, as when the flush fails
+            _redis_pipe_ctx.reset(token)
+
+        assert await store.get_many(["k", "m"]) == [StringList(["a"]), StringList(["a"])]
+
+    @pytest.mark.asyncio
+    async def test_pipelined_write_is_read_back_once_flushed(self, store, request_pipe):
+        await store.set("k", StringList(["b"]))
+
+        assert "k" not in store._local
+        assert await store.get("k") == StringList(["b"])
+        assert "k" in store._local
@@ -0,0 +1,18 @@
+from redis.asyncio import BlockingConnectionPool
+
+from src.auth.persistence import _new_redis_pool
+from src.config import Settings
+
+
+class TestRedisStorePool:
+
+    def test_pool_blocks_instead_of_failing_when_exhausted(self, monkeypatch):
+        monkeypatch.setattr(Settings, "REDIS_POOL_SIZE", 7)
+        monkeypatch.setattr(Settings, "REDIS_POOL_TIMEOUT", 3)
+
+        pool = _new_redis_pool("localhost", 6379, None)
+
+        assert isinstance(pool, BlockingConnectionPool)
+        assert pool.max_connections == 7
+        assert pool.timeout == 3
+        assert pool.connection_kwargs["socket_keepalive"] is True
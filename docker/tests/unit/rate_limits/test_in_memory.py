@@ -4,7 +4,7 @@ import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from starlette.requests import Request
 from starlette.datastructures import Headers
-from src.auth.rate_limiter import _Bucket
+from src.auth.rate_limiter import _Bucket, NS_PER_SECOND
 import time
 from unittest.mock import MagicMock, patch, ANY
 import uuid
@@ -50,14 +50,14 @@ class TestInMemoryTokenBucketRateLimiter:
     async def test_tokens_refill_over_time(self):
         limiter = self.make_limiter(capacity=2, window_seconds=10)
 
-        with patch("time.monotonic") as mock_time:
-            mock_time.return_value = 1000.0
+        with patch("time.monotonic_ns") as mock_time:
+            mock_time.return_value = 1000 * NS_PER_SECOND
             await limiter.allow("user1")
             await limiter.allow("user1")
             assert await limiter.allow("user1") is False  # exhausted
 
             # Advance time by a full window — should fully refill
-            mock_time.return_value = 1010.0
+            mock_time.return_value = 1010 * NS_PER_SECOND
             assert await limiter.allow("user1") is True
 
     @pytest.mark.asyncio
@@ -65,14 +65,14 @@ class TestInMemoryTokenBucketRateLimiter:
         """Half a window should refill ~half the tokens."""
         limiter = self.make_limiter(capacity=4, window_seconds=10)  # rate = 0.4/s
 
-        with patch("time.monotonic") as mock_time:
-            mock_time.return_value = 1000.0
+        with patch("time.monotonic_ns") as mock_time:
+            mock_time.return_value = 1000 * NS_PER_SECOND
             for _ in range(4):
                 await limiter.allow("user1")
             assert await limiter.allow("user1") is False
 
             # Advance by 5s → refill 2 tokens
-            mock_time.return_value = 1005.0
+            mock_time.return_value = 1005 * NS_PER_SECOND
             assert await limiter.allow("user1") is True
             assert await limiter.allow("user1") is True
             assert await limiter.allow("user1") is False  # not a full refill
@@ -81,27 +81,27 @@ class TestInMemoryTokenBucketRateLimiter:
     async def test_expired_entry_resets_bucket(self):
         limiter = self.make_limiter(capacity=2, window_seconds=10, ttl=30)
 
-        with patch("time.monotonic") as mock_time:
-            mock_time.return_value = 1000.0
+        with patch("time.monotonic_ns") as mock_time:
+            mock_time.return_value = 1000 * NS_PER_SECOND
             await limiter.allow("user1")
             await limiter.allow("user1")
             assert await limiter.allow("user1") is False
 
             # Advance past TTL
-            mock_time.return_value = 1031.0
+            mock_time.return_value = 1031 * NS_PER_SECOND
             assert await limiter.allow("user1") is True  # bucket was reset
 
     def test_cleanup_removes_expired_entries(self):
         limiter = self.make_limiter(capacity=5, window_seconds=10, ttl=30)
 
-        with patch("time.monotonic") as mock_time:
-            mock_time.return_value = 1000.0
-            limiter.buckets["old_key"] = _Bucket(tokens=5, last_refill=1000.0, last_access=1000.0)
-            limiter.buckets["fresh_key"] = _Bucket(tokens=5, last_refill=1000.0, last_access=1000.0)
+        with patch("time.monotonic_ns") as mock_time:
+            mock_time.return_value = 1000 * NS_PER_SECOND
+            limiter.buckets["old_key"] = _Bucket(tokens=5, last_ts=1000 * NS_PER_SECOND)
+            limiter.buckets["fresh_key"] = _Bucket(tokens=5, last_ts=1000 * NS_PER_SECOND)
 
-            mock_time.return_value = 1031.0
-            # Touch fresh_key so its last_access is recent
-            limiter.buckets["fresh_key"].last_access = 1031.0
+            mock_time.return_value = 1031 * NS_PER_SECOND
+            # Touch fresh_key so its last_ts is recent
+            limiter.buckets["fresh_key"].last_ts = 1031 * NS_PER_SECOND
 
             removed = limiter.cleanup()
 
@@ -111,21 +111,50 @@ class TestInMemoryTokenBucketRateLimiter:
 
     def test_cleanup_returns_zero_when_nothing_expired(self):
         limiter = self.make_limiter(ttl=3600)
-        with patch("time.monotonic", return_value=1000.0):
-            limiter.buckets["key"] = _Bucket(tokens=5, last_refill=1000.0, last_access=1000.0)
+        with patch("time.monotonic_ns", return_value=1000 * NS_PER_SECOND):
+            limiter.buckets["key"] = _Bucket(tokens=5, last_ts=1000 * NS_PER_SECOND)
             removed = limiter.cleanup()
         assert removed == 0
 
+    @pytest.mark.asyncio
+    async def test_allow_evicts_idle_buckets_from_lru_head(self):
+        limiter = self.make_limiter(capacity=5, window_seconds=10, ttl=30)
+
+        with patch("time.monotonic_ns") as mock_time:
+            mock_time.return_value = 1000 * NS_PER_SECOND
+            await limiter.allow("idle")
+            await limiter.allow("active")
+
+            mock_time.return_value = 1020 * NS_PER_SECOND
+            await limiter.allow("active")
+
+            mock_time.return_value = 1031 * NS_PER_SECOND
+            await limiter.allow("new")
+
+        assert "idle" not in limiter.buckets
+        assert list(limiter.buckets) == ["active", "new"]
+
+    @pytest.mark.asyncio
+    async def test_max_entries_evicts_least_recently_allowed(self):
+        limiter = InMemoryTokenBucketRateLimiter(capacity=5, window_seconds=10, max_entries=2)
+
+        await limiter.allow("a")
+        await limiter.allow("b")
+        await limiter.allow("a")
+        await limiter.allow("c")
+
+        assert list(limiter.buckets) == ["a", "c"]
+
     @pytest.mark.asyncio
     async def test_ttl_resets_bucket(self, monkeypatch):
         limiter = self.make_limiter(capacity=5, window_seconds=10, ttl=5)
 
-        fake_time = 1000.0
+        fake_time = 1000 * NS_PER_SECOND
 
         def fake_monotonic():
             return fake_time
 
-        monkeypatch.setattr(time, "monotonic", fake_monotonic)
+        monkeypatch.setattr(time, "monotonic_ns", fake_monotonic)
 
         # Use up capacity
         for _ in range(5):
@@ -134,7 +163,7 @@ class TestInMemoryTokenBucketRateLimiter:
         assert await limiter.allow("user1") is False
 
         # Advance beyond TTL
-        fake_time += 6.0
+        fake_time += 6 * NS_PER_SECOND
 
         # Should behave like fresh bucket
         assert await limiter.allow("user1") is True
@@ -143,36 +172,36 @@ class TestInMemoryTokenBucketRateLimiter:
     @pytest.mark.asyncio
     async def test_cleanup_with_rejected_requests_bug(self):
         """
-        Correctly demonstrates the bug: rejected requests update last_access,
+        Correctly demonstrates the bug: rejected requests update last_ts,
         preventing cleanup even when the user is truly inactive.
         """
         bucket = InMemoryTokenBucketRateLimiter(capacity=1, window_seconds=60, entry_ttl_seconds=1)
 
         # --- Setup: Create an entry and use up its token ---
         # Use a controlled starting time
-        start_time = 1000.0
-        with patch('time.monotonic', return_value=start_time):
+        start_time = 1000 * NS_PER_SECOND
+        with patch('time.monotonic_ns', return_value=start_time):
             # 1. First request creates the bucket (tokens become capacity-1 = 0)
             await bucket.allow("key1")
             assert "key1" in bucket.buckets
             bucket1 = bucket.buckets["key1"]
             assert bucket1.tokens == 0
-            # Record the last_access after this successful request
-            last_access_after_success = bucket1.last_access
-            assert last_access_after_success == start_time
+            # Record the last_ts after this successful request
+            last_ts_after_success = bucket1.last_ts
+            assert last_ts_after_success == start_time
 
         # --- Simulate a rejected request a bit later, but still within TTL ---
-        rejected_request_time = start_time + 0.5
-        with patch('time.monotonic', return_value=rejected_request_time):
+        rejected_request_time = start_time + NS_PER_SECOND // 2
+        with patch('time.monotonic_ns', return_value=rejected_request_time):
             # 2. This request will be rejected because tokens are 0 and refill rate is slow
             result = await bucket.allow("key1")
             assert result is False
 
-            # --- VERIFY THE BUG: last_access IS UPDATED on rejection ---
+            # --- VERIFY THE BUG: last_ts IS UPDATED on rejection ---
             bucket2 = bucket.buckets["key1"]
             # This assertion will FAIL in the buggy version, proving the bug exists
-            assert bucket2.last_access == last_access_after_success, \
-                f"BUG: last_access changed from {last_access_after_success} to {bucket2.last_access} on rejection!"
+            assert bucket2.last_ts == last_ts_after_success, \
+                f"BUG: last_ts changed from {last_ts_after_success} to {bucket2.last_ts} on rejection!"
 
             # Cleanup now (still within TTL) should not remove the entry
             cleaned = bucket.cleanup()
@@ -180,18 +209,18 @@ class TestInMemoryTokenBucketRateLimiter:
             assert "key1" in bucket.buckets
 
         # --- Simulate time passing beyond the TTL ---
-        cleanup_time = start_time + 2.0  # Beyond the 1-second TTL
-        with patch('time.monotonic', return_value=cleanup_time):
+        cleanup_time = start_time + 2 * NS_PER_SECOND  # Beyond the 1-second TTL
+        with patch('time.monotonic_ns', return_value=cleanup_time):
             # 3. Run cleanup. In a correct implementation, the entry should be removed
             #    because the last successful request was at start_time.
             cleaned = bucket.cleanup()
 
             # --- VERIFY THE CLEANUP FAILURE DUE TO THE BUG ---
             # In the BUGGY version, this assertion will FAIL (cleaned will be 0)
-            # because last_access was updated to rejected_request_time (0.5s),
+            # because last_ts was updated to rejected_request_time (0.5s),
             # making the entry appear active.
             assert cleaned == 1, \
-                "BUG: Entry was not cleaned up because last_access was updated by rejected requests!"
+                "BUG: Entry was not cleaned up because last_ts was updated by rejected requests!"
             assert "key1" not in bucket.buckets
 
 
@@ -212,8 +241,8 @@ class TestInMemoryTokenBucketRateLimiter:
         mock_request = MagicMock(spec=Request)
         
         with patch("src.auth.remote_auth.get_client_ip", return_value=test_ip), \
-            patch("src.auth.remote_auth.client_ip_vs_client_ids_store") as mock_ip_store, \
-            patch("src.auth.remote_auth.registed_clients_store") as mock_reg_store, \
+            patch("src.auth.remote_auth.client_ip_vs_client_ids_store", new_callable=AsyncMock) as mock_ip_store, \
+            patch("src.auth.remote_auth.registed_clients_store", new_callable=AsyncMock) as mock_reg_store, \
             patch("src.auth.remote_auth.Settings") as mock_settings:
             
             mock_ip_store.get.return_value = StringList(root=existing_client_ids[:])
@@ -239,7 +268,7 @@ class TestInMemoryTokenBucketRateLimiter:
             assert "id1" not in updated_list
             assert any(isinstance(uuid.UUID(x), uuid.UUID) for x in updated_list if x not in existing_client_ids)
 
-            mock_reg_store.delete.assert_called_once_with("id1")
+            mock_reg_store.delete_many.assert_called_once_with(["id1"])
 
 
     @pytest.mark.asyncio
@@ -261,8 +290,8 @@ class TestInMemoryTokenBucketRateLimiter:
         mock_request = MagicMock(spec=Request)
         
         with patch("src.auth.remote_auth.get_client_ip") as mock_get_ip, \
-            patch("src.auth.remote_auth.client_ip_vs_client_ids_store") as mock_ip_store, \
-            patch("src.auth.remote_auth.registed_clients_store") as mock_reg_store, \
+            patch("src.auth.remote_auth.client_ip_vs_client_ids_store", new_callable=AsyncMock) as mock_ip_store, \
+            patch("src.auth.remote_auth.registed_clients_store", new_callable=AsyncMock) as mock_reg_store, \
             patch("src.auth.remote_auth.Settings") as mock_settings:
             
             mock_settings.MCP_SERVER_PUBLIC_URL = "https://api.example.com"
@@ -284,7 +313,7 @@ class TestInMemoryTokenBucketRateLimiter:
             await register_client(payload, mock_request)
 
             # Verify IP-A's list was updated to 5 items and NO deletions happened
-            assert mock_reg_store.delete.call_count == 0
+            assert mock_reg_store.delete_many.call_count == 0
             mock_ip_store.set.assert_called_with(ip_a, ANY, ttl_in_sec=18000)
             
             # --- STEP 2: Register for IP-B ---
@@ -295,7 +324,7 @@ class TestInMemoryTokenBucketRateLimiter:
 
             # --- FINAL ASSERTIONS ---
             # 1. Deletions should STILL be 0 because both IPs are exactly at 5
-            assert mock_reg_store.delete.call_count == 0
+            assert mock_reg_store.delete_many.call_count == 0
             
             # 2. Verify IP-B's set call specifically
             # This confirms that IP-B's registration didn't interfere with IP-A
@@ -327,12 +356,12 @@ class TestInMemoryCleanupEdgeCases:
     def test_cleanup_removes_all_expired_entries(self):
         """When every entry is past TTL, cleanup removes them all."""
         limiter = self.make_limiter(ttl=30)
-        with patch("time.monotonic") as mock_time:
-            mock_time.return_value = 1000.0
+        with patch("time.monotonic_ns") as mock_time:
+            mock_time.return_value = 1000 * NS_PER_SECOND
             for key in ["a", "b", "c"]:
-                limiter.buckets[key] = _Bucket(tokens=5, last_refill=1000.0, last_access=1000.0)
+                limiter.buckets[key] = _Bucket(tokens=5, last_ts=1000 * NS_PER_SECOND)
 
-            mock_time.return_value = 1031.0
+            mock_time.return_value = 1031 * NS_PER_SECOND
             removed = limiter.cleanup()
 
         assert removed == 3
@@ -341,15 +370,15 @@ class TestInMemoryCleanupEdgeCases:
     def test_cleanup_partial_expiry_mixed_entries(self):
         """Only expired entries are removed; fresh entries survive."""
         limiter = self.make_limiter(ttl=30)
-        with patch("time.monotonic") as mock_time:
-            mock_time.return_value = 1000.0
+        with patch("time.monotonic_ns") as mock_time:
+            mock_time.return_value = 1000 * NS_PER_SECOND
             for key in ["expired1", "expired2", "fresh1", "fresh2"]:
-                limiter.buckets[key] = _Bucket(tokens=5, last_refill=1000.0, last_access=1000.0)
+                limiter.buckets[key] = _Bucket(tokens=5, last_ts=1000 * NS_PER_SECOND)
 
-            mock_time.return_value = 1031.0
-            # Bump fresh entries' last_access to the current (non-expired) time
-            limiter.buckets["fresh1"].last_access = 1031.0
-            limiter.buckets["fresh2"].last_access = 1031.0
+            mock_time.return_value = 1031 * NS_PER_SECOND
+            # Bump fresh entries' last_ts to the current (non-expired) time
+            limiter.buckets["fresh1"].last_ts = 1031 * NS_PER_SECOND
+            limiter.buckets["fresh2"].last_ts = 1031 * NS_PER_SECOND
 
             removed = limiter.cleanup()
 
@@ -362,14 +391,14 @@ class TestInMemoryCleanupEdgeCases:
     def test_cleanup_exact_ttl_boundary_is_not_expired(self):
         """
         An entry whose age equals exactly the TTL is NOT removed because the
-        condition is strictly greater-than: now - last_access > ttl.
+        condition is strictly greater-than: now - last_ts > ttl.
         """
         limiter = self.make_limiter(ttl=30)
-        with patch("time.monotonic") as mock_time:
-            mock_time.return_value = 1000.0
-            limiter.buckets["key"] = _Bucket(tokens=5, last_refill=1000.0, last_access=1000.0)
+        with patch("time.monotonic_ns") as mock_time:
+            mock_time.return_value = 1000 * NS_PER_SECOND
+            limiter.buckets["key"] = _Bucket(tokens=5, last_ts=1000 * NS_PER_SECOND)
 
-            mock_time.return_value = 1030.0  # age == 30 == ttl  →  NOT expired
+            mock_time.return_value = 1030 * NS_PER_SECOND  # age == 30 == ttl  →  NOT expired
             removed = limiter.cleanup()
 
         assert removed == 0
@@ -378,11 +407,11 @@ class TestInMemoryCleanupEdgeCases:
     def test_cleanup_one_tick_past_ttl_is_expired(self):
         """An entry one second past the TTL IS removed."""
         limiter = self.make_limiter(ttl=30)
-        with patch("time.monotonic") as mock_time:
-            mock_time.return_value = 1000.0
-            limiter.buckets["key"] = _Bucket(tokens=5, last_refill=1000.0, last_access=1000.0)
+        with patch("time.monotonic_ns") as mock_time:
+            mock_time.return_value = 1000 * NS_PER_SECOND
+            limiter.buckets["key"] = _Bucket(tokens=5, last_ts=1000 * NS_PER_SECOND)
 
-            mock_time.return_value = 1031.0  # age == 31 > 30 == ttl  →  expired
+            mock_time.return_value = 1031 * NS_PER_SECOND  # age == 31 > 30 == ttl  →  expired
             removed = limiter.cleanup()
 
         assert removed == 1
@@ -391,11 +420,11 @@ class TestInMemoryCleanupEdgeCases:
     def test_cleanup_is_idempotent(self):
         """A second cleanup call after the first has nothing left to remove."""
         limiter = self.make_limiter(ttl=30)
-        with patch("time.monotonic") as mock_time:
-            mock_time.return_value = 1000.0
-            limiter.buckets["key"] = _Bucket(tokens=5, last_refill=1000.0, last_access=1000.0)
+        with patch("time.monotonic_ns") as mock_time:
+            mock_time.return_value = 1000 * NS_PER_SECOND
+            limiter.buckets["key"] = _Bucket(tokens=5, last_ts=1000 * NS_PER_SECOND)
 
-            mock_time.return_value = 1031.0
+            mock_time.return_value = 1031 * NS_PER_SECOND
             first = limiter.cleanup()
             second = limiter.cleanup()
 
@@ -409,19 +438,19 @@ class TestInMemoryCleanupEdgeCases:
         n_expired = 7
         n_fresh = 3
 
-        with patch("time.monotonic") as mock_time:
-            mock_time.return_value = 1000.0
+        with patch("time.monotonic_ns") as mock_time:
+            mock_time.return_value = 1000 * NS_PER_SECOND
             for i in range(n_expired):
                 limiter.buckets[f"expired_{i}"] = _Bucket(
-                    tokens=5, last_refill=1000.0, last_access=1000.0
+                    tokens=5, last_ts=1000 * NS_PER_SECOND
                 )
             for i in range(n_fresh):
-                # last_access is already "in the future" relative to cleanup time
+                # last_ts is already "in the future" relative to cleanup time
                 limiter.buckets[f"fresh_{i}"] = _Bucket(
-                    tokens=5, last_refill=1000.0, last_access=1031.0
+                    tokens=5, last_ts=1031 * NS_PER_SECOND
                 )
 
-            mock_time.return_value = 1031.0
+            mock_time.return_value = 1031 * NS_PER_SECOND
             removed = limiter.cleanup()
 
         assert removed == n_expired
@@ -431,12 +460,12 @@ class TestInMemoryCleanupEdgeCases:
     async def test_cleanup_preserves_recently_active_user(self):
         """A user who made a request within the TTL window is never cleaned up."""
         limiter = self.make_limiter(capacity=5, window_seconds=10, ttl=30)
-        with patch("time.monotonic") as mock_time:
-            mock_time.return_value = 1000.0
+        with patch("time.monotonic_ns") as mock_time:
+            mock_time.return_value = 1000 * NS_PER_SECOND
             await limiter.allow("active_user")
 
             # Advance to within TTL (20 s < 30 s)
-            mock_time.return_value = 1020.0
+            mock_time.return_value = 1020 * NS_PER_SECOND
             removed = limiter.cleanup()
 
         assert removed == 0
@@ -446,16 +475,16 @@ class TestInMemoryCleanupEdgeCases:
     async def test_cleanup_only_removes_inactive_users_not_active_ones(self):
         """Mix of active and inactive users: only inactive ones are cleaned up."""
         limiter = self.make_limiter(capacity=5, window_seconds=10, ttl=30)
-        with patch("time.monotonic") as mock_time:
-            mock_time.return_value = 1000.0
+        with patch("time.monotonic_ns") as mock_time:
+            mock_time.return_value = 1000 * NS_PER_SECOND
             await limiter.allow("active")
             await limiter.allow("inactive")
 
-            # inactive user's last_access stays at 1000.0
+            # inactive user's last_ts stays at 1000.0
             # Manually rewind inactive to ensure it reads as old
-            mock_time.return_value = 1031.0
-            limiter.buckets["active"].last_access = 1031.0  # still fresh
-            # inactive.last_access remains 1000.0
+            mock_time.return_value = 1031 * NS_PER_SECOND
+            limiter.buckets["active"].last_ts = 1031 * NS_PER_SECOND  # still fresh
+            # inactive.last_ts remains 1000.0
 
             removed = limiter.cleanup()
 
@@ -467,17 +496,17 @@ class TestInMemoryCleanupEdgeCases:
         """cleanup() scales correctly with many entries."""
         limiter = self.make_limiter(ttl=30)
         n = 1000
-        with patch("time.monotonic") as mock_time:
-            mock_time.return_value = 1000.0
+        with patch("time.monotonic_ns") as mock_time:
+            mock_time.return_value = 1000 * NS_PER_SECOND
             for i in range(n):
                 limiter.buckets[f"key_{i}"] = _Bucket(
-                    tokens=5, last_refill=1000.0, last_access=1000.0
+                    tokens=5, last_ts=1000 * NS_PER_SECOND
                 )
             # Half expire, half stay fresh
             for i in range(n // 2):
-                limiter.buckets[f"key_{i}"].last_access = 1031.0
+                limiter.buckets[f"key_{i}"].last_ts = 1031 * NS_PER_SECOND
 
-            mock_time.return_value = 1031.0
+            mock_time.return_value = 1031 * NS_PER_SECOND
             removed = limiter.cleanup()
 
         assert removed == n // 2
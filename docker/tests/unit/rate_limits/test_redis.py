@@ -5,10 +5,10 @@ import pytest
 
 from src.auth.rate_limiter import RedisTokenBucketRateLimiter
 
-# Patch target: time module inside fakeredis's TIME command implementation.
-# The Redis TIME command in fakeredis calls time.time(), so patching this
-# module-level reference controls the clock seen by the Lua token-bucket script.
-_FAKEREDIS_TIME_MODULE = "fakeredis.commands_mixins.server_mixin.time"
+# Patch target: time module inside the rate limiter. The limiter passes
+# time.time() to the Lua token-bucket script, so patching this module-level
+# reference controls the clock seen by the script.
+_RATE_LIMITER_TIME_MODULE = "src.auth.rate_limiter.time"
 
 
 class TestRedisTokenBucketRateLimiter:
@@ -62,7 +62,7 @@ class TestRedisTokenBucketRateLimiter:
     async def test_tokens_refill_over_time(self):
         _, limiter = self.make_limiter(capacity=2, window_seconds=10)
 
-        with patch(_FAKEREDIS_TIME_MODULE) as mock_time_mod:
+        with patch(_RATE_LIMITER_TIME_MODULE) as mock_time_mod:
             mock_time_mod.time.return_value = 1000.0
 
             await limiter.allow("user1")
@@ -77,7 +77,7 @@ class TestRedisTokenBucketRateLimiter:
         """Half a window should refill ~half the tokens."""
         _, limiter = self.make_limiter(capacity=4, window_seconds=10)  # rate = 0.0004 tokens/ms
 
-        with patch(_FAKEREDIS_TIME_MODULE) as mock_time_mod:
+        with patch(_RATE_LIMITER_TIME_MODULE) as mock_time_mod:
             mock_time_mod.time.return_value = 1000.0
 
             for _ in range(4):
@@ -318,7 +318,7 @@ class TestRedisTokenBucketRateLimiter:
         """
         _, limiter = self.make_limiter(capacity=5, window_seconds=10)
 
-        with patch(_FAKEREDIS_TIME_MODULE) as mock_time_mod:
+        with patch(_RATE_LIMITER_TIME_MODULE) as mock_time_mod:
             mock_time_mod.time.return_value = 1000.0
             for _ in range(5):
                 await limiter.allow("user1")
@@ -342,7 +342,7 @@ class TestRedisTokenBucketRateLimiter:
         """After a full window elapses, a capacity=1 bucket grants one more request."""
         _, limiter = self.make_limiter(capacity=1, window_seconds=10)
 
-        with patch(_FAKEREDIS_TIME_MODULE) as mock_time_mod:
+        with patch(_RATE_LIMITER_TIME_MODULE) as mock_time_mod:
             mock_time_mod.time.return_value = 1000.0
             assert await limiter.allow("user1") is True
             assert await limiter.allow("user1") is False
@@ -350,3 +350,19 @@ class TestRedisTokenBucketRateLimiter:
             mock_time_mod.time.return_value = 1010.0  # full window elapsed
             assert await limiter.allow("user1") is True
             assert await limiter.allow("user1") is False
+
+    # ------------------------------------------------------------------ #
+    # allow_many                                                           #
+    # ------------------------------------------------------------------ #
+
+    async def test_allow_many_checks_each_key_independently(self):
+        """allow_many() returns one result per key, in order, like repeated allow() calls."""
+        _, limiter = self.make_limiter(capacity=1, window_seconds=10)
+        assert await limiter.allow("a") is True
+
+        assert await limiter.allow_many(["a", "b", "b"]) == [False, True, False]
+        assert await limiter.allow("c") is True
+
+    async def test_allow_many_empty_keys(self):
+        _, limiter = self.make_limiter(capacity=1, window_seconds=10)
+        assert await limiter.allow_many([]) == []